@@ -5,22 +5,34 @@ Implements comprehensive document management with security, monitoring, and scal
 Version: 1.0.0
 """
 
+import asyncio
 import logging
+import logging.handlers
+import os
+import queue
 import uvicorn  # version: 0.23.0
 from fastapi import FastAPI, Request
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from prometheus_fastapi_instrumentator import Prometheus, Instrumentator  # version: 5.9.1
 from fastapi_limiter import FastAPILimiter  # version: 0.1.5
-import aioredis  # version: 2.0.1
+from redis import asyncio as aioredis  # version: 4.6.0
 import mongoengine
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import time
 
-from config import service_config, mongodb_config, logging_config, security_config
-from controllers.document_controller import router as document_router
+from config import service_config, mongodb_config, redis_config, logging_config, security_config
+from controllers.document_controller import (
+    router as document_router,
+    motor_client,
+    document_writer,
+    storage_service,
+    validator_pool
+)
+from middleware.compression import CompressionMiddleware
+from middleware.headers import HeadersMiddleware
 
 # Initialize FastAPI application with OpenAPI documentation
 app = FastAPI(
@@ -29,12 +41,26 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 
+# Background listener that performs log I/O off the event loop
+log_listener: Optional[logging.handlers.QueueListener] = None
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that enqueues records untouched.
+    Message and traceback formatting happen on the listener thread instead of
+    in the request path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
 # Initialize Prometheus metrics
 instrumentator = Instrumentator(
     should_group_status_codes=False,
@@ -49,19 +75,28 @@ instrumentator = Instrumentator(
 
 async def configure_logging() -> None:
     """Configure comprehensive logging with structured output."""
+    global log_listener
     try:
+        formatter = logging.Formatter(logging_config['format'])
+        handlers = [
+            logging.StreamHandler(),
+            logging.handlers.RotatingFileHandler(
+                filename="document_service.log",
+                maxBytes=logging_config['rotation_size_mb'] * 1024 * 1024,
+                backupCount=logging_config['retention_days']
+            )
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        # Request path only enqueues; stream/file writes run on the listener thread
+        log_queue = queue.SimpleQueue()
+        log_listener = logging.handlers.QueueListener(log_queue, *handlers)
         logging.basicConfig(
             level=logging_config['level'],
-            format=logging_config['format'],
-            handlers=[
-                logging.StreamHandler(),
-                logging.handlers.RotatingFileHandler(
-                    filename="document_service.log",
-                    maxBytes=logging_config['rotation_size_mb'] * 1024 * 1024,
-                    backupCount=logging_config['retention_days']
-                )
-            ]
+            handlers=[DeferredQueueHandler(log_queue)]
         )
+        log_listener.start()
         logger.info("Logging configured successfully")
     except Exception as e:
         logger.error(f"Failed to configure logging: {str(e)}")
@@ -84,7 +119,7 @@ async def configure_mongodb() -> None:
         logger.error(f"Failed to configure MongoDB: {str(e)}")
         raise
 
-async def configure_middleware() -> None:
+def configure_middleware() -> None:
     """Configure comprehensive middleware stack."""
     try:
         # CORS middleware
@@ -97,33 +132,26 @@ async def configure_middleware() -> None:
             expose_headers=["Content-Disposition"]
         )
 
-        # Compression middleware
-        app.add_middleware(GZipMiddleware, minimum_size=1000)
-
-        # Security headers middleware
-        @app.middleware("http")
-        async def add_security_headers(request: Request, call_next):
-            response = await call_next(request)
-            response.headers["X-Content-Type-Options"] = "nosniff"
-            response.headers["X-Frame-Options"] = "DENY"
-            response.headers["X-XSS-Protection"] = "1; mode=block"
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-            return response
-
-        # Request ID middleware
-        @app.middleware("http")
-        async def add_request_id(request: Request, call_next):
-            request_id = request.headers.get("X-Request-ID", str(time.time()))
-            request.state.request_id = request_id
-            response = await call_next(request)
-            response.headers["X-Request-ID"] = request_id
-            return response
-
-        # Error handling middleware
+        # Compression middleware (zstd/br/gzip negotiated per request)
+        app.add_middleware(CompressionMiddleware, minimum_size=512)
+
+        # Security headers and request ID, outermost so every response carries them
+        app.add_middleware(HeadersMiddleware)
+
+        # Expected client errors: plain response, no traceback formatting
+        @app.exception_handler(StarletteHTTPException)
+        async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+            return ORJSONResponse(
+                status_code=exc.status_code,
+                content={"detail": exc.detail},
+                headers=getattr(exc, "headers", None)
+            )
+
+        # Unexpected errors only
         @app.exception_handler(Exception)
         async def global_exception_handler(request: Request, exc: Exception):
             logger.error(f"Global error handler: {str(exc)}", exc_info=True)
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"detail": "Internal server error", "request_id": request.state.request_id}
             )
@@ -133,6 +161,12 @@ async def configure_middleware() -> None:
         logger.error(f"Failed to configure middleware: {str(e)}")
         raise
 
+# Middleware must be registered before the application starts serving
+configure_middleware()
+
+# Initialize Prometheus metrics
+instrumentator.instrument(app).expose(app, include_in_schema=False)
+
 @app.on_event("startup")
 async def startup_event() -> None:
     """Initialize application components on startup."""
@@ -143,16 +177,16 @@ async def startup_event() -> None:
         # Configure MongoDB
         await configure_mongodb()
 
-        # Configure Redis for rate limiting
-        redis = await aioredis.from_url(
-            "redis://localhost",
+        # Configure pooled Redis client shared by rate limiting and health checks
+        redis_pool = aioredis.BlockingConnectionPool.from_url(
+            redis_config['url'],
+            max_connections=redis_config['max_connections'],
+            timeout=redis_config['pool_timeout'],
             encoding="utf-8",
             decode_responses=True
         )
-        await FastAPILimiter.init(redis)
-
-        # Initialize Prometheus metrics
-        instrumentator.instrument(app).expose(app, include_in_schema=False)
+        app.state.redis = aioredis.Redis(connection_pool=redis_pool)
+        await FastAPILimiter.init(app.state.redis)
 
         logger.info("Application startup completed successfully")
     except Exception as e:
@@ -163,15 +197,30 @@ async def startup_event() -> None:
 async def shutdown_event() -> None:
     """Cleanup resources on application shutdown."""
     try:
-        # Close MongoDB connection
+        # Write out any batched document updates
+        await document_writer.close()
+
+        # Stop upload validation workers
+        validator_pool.shutdown(wait=False, cancel_futures=True)
+
+        # Close S3 client
+        await storage_service.close()
+
+        # Close MongoDB connections
         mongoengine.disconnect()
+        motor_client.close()
 
-        # Close Redis connection
+        # Close Redis connections
         await FastAPILimiter.close()
+        await app.state.redis.connection_pool.disconnect()
 
         logger.info("Application shutdown completed successfully")
     except Exception as e:
         logger.error(f"Application shutdown error: {str(e)}")
+    finally:
+        # Flush queued log records
+        if log_listener is not None:
+            log_listener.stop()
 
 # Include API routes
 app.include_router(
@@ -180,19 +229,47 @@ app.include_router(
     tags=["documents"]
 )
 
+# Downstream probe results cached as (monotonic timestamp, services) so that
+# load balancer probe storms reach MongoDB and Redis at most once per TTL
+HEALTH_CACHE_TTL_SECONDS = 1.0
+_health_cache: Tuple[float, Optional[Dict[str, bool]]] = (0.0, None)
+_health_lock = asyncio.Lock()
+
+async def probe_services() -> Dict[str, bool]:
+    """Probe MongoDB and Redis concurrently."""
+    mongodb, redis = await asyncio.gather(
+        motor_client.admin.command("ping"),
+        app.state.redis.ping(),
+        return_exceptions=True
+    )
+    return {
+        "mongodb": isinstance(mongodb, dict) and mongodb.get("ok") == 1.0,
+        "redis": redis is True
+    }
+
 # Health check endpoint
 @app.get("/health")
 async def health_check() -> Dict[str, Any]:
     """Health check endpoint for monitoring."""
-    return {
-        "status": "healthy",
+    global _health_cache
+    checked_at, services = _health_cache
+    if services is None or time.monotonic() - checked_at >= HEALTH_CACHE_TTL_SECONDS:
+        async with _health_lock:
+            # Another request may have refreshed the cache while we waited
+            checked_at, services = _health_cache
+            if services is None or time.monotonic() - checked_at >= HEALTH_CACHE_TTL_SECONDS:
+                services = await probe_services()
+                _health_cache = (time.monotonic(), services)
+
+    content = {
+        "status": "healthy" if all(services.values()) else "unhealthy",
         "timestamp": time.time(),
         "version": "1.0.0",
-        "services": {
-            "mongodb": mongoengine.get_connection().server_info()["ok"] == 1.0,
-            "redis": await FastAPILimiter.redis.ping()
-        }
+        "services": services
     }
+    if not all(services.values()):
+        return ORJSONResponse(status_code=503, content=content)
+    return content
 
 def main() -> None:
     """Application entry point."""
@@ -201,7 +278,12 @@ def main() -> None:
             "app:app",
             host="0.0.0.0",
             port=8000,
-            workers=4,
+            workers=os.cpu_count() or 4,
+            loop="uvloop",
+            http="httptools",
+            backlog=4096,
+            limit_concurrency=1000,
+            timeout_keep_alive=30,
             log_level="info",
             reload=False,
             proxy_headers=True,
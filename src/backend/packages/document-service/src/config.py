@@ -6,8 +6,10 @@ Version: 1.0.0
 """
 
 import os
+from dataclasses import dataclass
 from functools import wraps
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, FrozenSet, Mapping
 from dotenv import load_dotenv  # version: ^1.0.0
 
 # Load environment variables from .env file
@@ -39,6 +41,41 @@ def validate_config(func):
         return config
     return wrapper
 
+@dataclass(slots=True, frozen=True)
+class ServiceConfig:
+    """
+    Immutable, typed view of the service settings.
+    Built once at import so request handlers use attribute access instead of dict lookups.
+    """
+    allowed_mime_types: FrozenSet[str]
+    max_upload_retries: int
+    presigned_url_expiry: int
+    upload_chunk_size: int
+    virus_scan_enabled: bool
+    strict_mime_detection: bool
+    content_validation_rules: Mapping[str, int]
+
+    @classmethod
+    def from_dict(cls, settings: Dict[str, Any]) -> 'ServiceConfig':
+        """
+        Build a ServiceConfig from the service_config dictionary.
+        
+        Args:
+            settings: Service configuration dictionary
+            
+        Returns:
+            ServiceConfig: Frozen configuration instance
+        """
+        return cls(
+            allowed_mime_types=frozenset(settings['allowed_mime_types']),
+            max_upload_retries=settings['max_upload_retries'],
+            presigned_url_expiry=settings['presigned_url_expiry'],
+            upload_chunk_size=settings['upload_chunk_size'],
+            virus_scan_enabled=settings['virus_scan_enabled'],
+            strict_mime_detection=settings['strict_mime_detection'],
+            content_validation_rules=MappingProxyType(dict(settings['content_validation_rules']))
+        )
+
 @validate_config
 def load_config() -> Dict[str, Any]:
     """
@@ -69,6 +106,13 @@ def load_config() -> Dict[str, Any]:
         'retry_writes': True
     }
 
+    # Redis configuration (rate limiting and health checks)
+    redis_config = {
+        'url': os.getenv('REDIS_URL', 'redis://localhost'),
+        'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', '256')),
+        'pool_timeout': int(os.getenv('REDIS_POOL_TIMEOUT', '5'))
+    }
+
     # Service configuration
     service_config = {
         'allowed_mime_types': [
@@ -82,6 +126,7 @@ def load_config() -> Dict[str, Any]:
         'presigned_url_expiry': int(os.getenv('PRESIGNED_URL_EXPIRY', '3600')),  # 1 hour
         'upload_chunk_size': int(os.getenv('UPLOAD_CHUNK_SIZE', '5242880')),  # 5MB
         'virus_scan_enabled': os.getenv('VIRUS_SCAN_ENABLED', 'True').lower() == 'true',
+        'strict_mime_detection': os.getenv('STRICT_MIME_DETECTION', 'False').lower() == 'true',
         'content_validation_rules': {
             'max_pages': int(os.getenv('MAX_DOCUMENT_PAGES', '50')),
             'min_dpi': int(os.getenv('MIN_DOCUMENT_DPI', '300')),
@@ -132,6 +177,7 @@ def load_config() -> Dict[str, Any]:
     return {
         'storage_config': storage_config,
         'mongodb_config': mongodb_config,
+        'redis_config': redis_config,
         'service_config': service_config,
         'logging_config': logging_config
     }
@@ -140,5 +186,7 @@ def load_config() -> Dict[str, Any]:
 config = load_config()
 storage_config = config['storage_config']
 mongodb_config = config['mongodb_config']
+redis_config = config['redis_config']
 service_config = config['service_config']
+SERVICE_CONFIG = ServiceConfig.from_dict(service_config)
 logging_config = config['logging_config']
\ No newline at end of file
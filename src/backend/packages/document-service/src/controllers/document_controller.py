@@ -5,32 +5,86 @@ Implements comprehensive security, monitoring and audit logging.
 Version: 1.0.0
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Depends, status
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Response, Header, Depends, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, UUID4
 from datetime import datetime
+import asyncio
 import logging
+import os
+import re
 import uuid
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, List
+from motor.motor_asyncio import AsyncIOMotorClient  # version: 3.3.0
+from pymongo import UpdateOne
+import mongoengine  # version: 0.27.0
+import xxhash  # version: 3.4.1
 from prometheus_client import Counter, Histogram
 import time
 
 from models.document import Document, DocumentStatus, VerificationStatus
-from services.storage_service import StorageService
-from utils.file_validator import validate_file
-from config import service_config
+from services.storage_service import AsyncStorageService, TRANSFER_CONFIG
+from services.bulk_writer import BulkDocumentWriter
+from utils.file_validator import StreamingValidator, ALLOWED_MIME_TYPES
+from utils.ids import uuid7
+from config import SERVICE_CONFIG, mongodb_config
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Client checksums are lower-case hex SHA-256 digests of the uploaded content
+_SHA256_HEX = re.compile(r'[0-9a-f]{64}')
+
 # Initialize router with prefix and tags
 router = APIRouter(prefix="/api/v1/documents", tags=["documents"])
 
 # Initialize OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Document metadata writes (uploads, deletes, verifications) are coalesced into
+# bulk_write batches; the short window bounds the latency added to each request
+DOCUMENT_FLUSH_INTERVAL_SECONDS = 0.02
+document_writer = BulkDocumentWriter(
+    flush_every=500,
+    flush_interval_s=DOCUMENT_FLUSH_INTERVAL_SECONDS
+)
+
 # Initialize storage service
-storage_service = StorageService()
+storage_service = AsyncStorageService(document_writer)
+
+# Async MongoDB client for hot read paths (bypasses mongoengine deserialization)
+motor_client = AsyncIOMotorClient(
+    mongodb_config['uri'],
+    maxPoolSize=mongodb_config['connection_pool_size']
+)
+# Read the collection the Document model writes to; as for mongoengine, a
+# database named in the URI takes precedence over the configured one
+documents_coll = motor_client.get_default_database(mongodb_config['database'])[
+    Document._get_collection_name()
+]
+
+# Upload validation (MIME sniff, hashing, virus scan) runs here instead of on the
+# event loop; hashlib releases the GIL for chunk-sized inputs
+validator_pool = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 4,
+    thread_name_prefix="upload-validator"
+)
+
+# Encryption status reported for every stored document
+ENCRYPTION_STATUS = "AES-256-GCM"
+
+# Fields read by the document endpoints; nothing else is transferred or decoded
+DOCUMENT_PROJECTION = {
+    "_id": 1,
+    "application_id": 1,
+    "file_name": 1,
+    "mime_type": 1,
+    "status": 1,
+    "verification_status": 1,
+    "uploaded_at": 1,
+    "storage_path": 1
+}
 
 # Prometheus metrics
 document_metrics = Counter(
@@ -45,6 +99,23 @@ operation_latency = Histogram(
     ['operation']
 )
 
+# Pre-resolved metric children, avoiding a labels() lookup per request
+UPLOAD_SUCCESS = document_metrics.labels(operation='upload', status='success')
+UPLOAD_FAILED = document_metrics.labels(operation='upload', status='failed')
+UPLOAD_LATENCY = operation_latency.labels(operation='upload')
+GET_SUCCESS = document_metrics.labels(operation='get', status='success')
+GET_FAILED = document_metrics.labels(operation='get', status='failed')
+GET_LATENCY = operation_latency.labels(operation='get')
+DOWNLOAD_SUCCESS = document_metrics.labels(operation='download', status='success')
+DOWNLOAD_FAILED = document_metrics.labels(operation='download', status='failed')
+DOWNLOAD_LATENCY = operation_latency.labels(operation='download')
+DELETE_SUCCESS = document_metrics.labels(operation='delete', status='success')
+DELETE_FAILED = document_metrics.labels(operation='delete', status='failed')
+DELETE_LATENCY = operation_latency.labels(operation='delete')
+VERIFY_SUCCESS = document_metrics.labels(operation='verify', status='success')
+VERIFY_FAILED = document_metrics.labels(operation='verify', status='failed')
+VERIFY_LATENCY = operation_latency.labels(operation='verify')
+
 class DocumentUploadRequest(BaseModel):
     """Pydantic model for document upload request validation"""
     application_id: UUID4
@@ -55,7 +126,9 @@ class DocumentUploadRequest(BaseModel):
 
 class DocumentResponse(BaseModel):
     """Pydantic model for document response serialization"""
-    id: UUID4
+    model_config = {"from_attributes": True}
+
+    id: uuid.UUID
     application_id: UUID4
     file_name: str
     mime_type: str
@@ -63,7 +136,7 @@ class DocumentResponse(BaseModel):
     verification_status: str
     uploaded_at: datetime
     encryption_status: str
-    last_accessed: Optional[str]
+    last_accessed: Optional[datetime]
     access_count: int
 
 async def validate_token(token: str = Depends(oauth2_scheme)):
@@ -76,6 +149,73 @@ async def validate_token(token: str = Depends(oauth2_scheme)):
     # Token validation logic would be implemented here
     return token
 
+async def find_document(document_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the projected fields of a document by primary key.
+    
+    Args:
+        document_id: Document UUID
+        
+    Returns:
+        Optional[Dict[str, Any]]: Raw document, or None if not found
+    """
+    return await documents_coll.find_one(
+        {"_id": str(document_id)},
+        DOCUMENT_PROJECTION
+    )
+
+def document_etag(doc: Dict[str, Any]) -> str:
+    """
+    Compute the entity tag for a document's mutable state.
+    Weak, since last_accessed in the body changes on every read.
+    
+    Args:
+        doc: Raw document as returned by Motor with DOCUMENT_PROJECTION
+        
+    Returns:
+        str: Weak ETag header value
+    """
+    digest = xxhash.xxh3_64_hexdigest(
+        f"{doc['status']}|{doc['verification_status']}|{doc['uploaded_at'].isoformat()}".encode()
+    )
+    return f'W/"{digest}"'
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def build_document_response(doc: Dict[str, Any], last_accessed: Optional[datetime],
+                            access_count: int) -> DocumentResponse:
+    """
+    Build a DocumentResponse from a raw MongoDB document.
+    Values come from our own storage, so field validation is skipped.
+    
+    Args:
+        doc: Raw document as returned by Motor with DOCUMENT_PROJECTION
+        last_accessed: Last access timestamp
+        access_count: Access count
+        
+    Returns:
+        DocumentResponse: Response model
+    """
+    return DocumentResponse.model_construct(
+        id=uuid.UUID(doc["_id"]),
+        application_id=uuid.UUID(doc["application_id"]),
+        file_name=doc["file_name"],
+        mime_type=doc["mime_type"],
+        status=doc["status"],
+        verification_status=doc["verification_status"],
+        uploaded_at=doc["uploaded_at"],
+        encryption_status=ENCRYPTION_STATUS,
+        last_accessed=last_accessed,
+        access_count=access_count
+    )
+
 @router.post("/", response_model=DocumentResponse)
 async def upload_document(
     file: UploadFile = File(...),
@@ -93,36 +233,155 @@ async def upload_document(
     Returns:
         DocumentResponse: Created document metadata
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     
+    # Reject disallowed types before reading any content
+    if request.mime_type.lower() not in ALLOWED_MIME_TYPES:
+        UPLOAD_FAILED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File validation failed: MIME type not allowed: {request.mime_type}"
+        )
+    
+    # The checksum is stored with the object, so it must be a well-formed digest
+    expected_hash = request.checksum.strip().lower()
+    if not _SHA256_HEX.fullmatch(expected_hash):
+        UPLOAD_FAILED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File validation failed: invalid checksum"
+        )
+    
+    # Content is stored once under its checksum; the document's reference on it
+    # is taken up front and kept only if the document record is created
+    document_id = uuid7()
+    storage_path = storage_service.content_storage_path(expected_hash)
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Validate file
-        is_valid, error_msg, metadata = validate_file(
-            file_content,
-            request.mime_type,
-            request.file_name
+        existing = await storage_service.reserve_content(
+            storage_path,
+            document_id,
+            request.mime_type
         )
+    except ValueError as e:
+        UPLOAD_FAILED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        UPLOAD_FAILED.inc()
+        logger.error(f"Document upload failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    referenced = True
+    
+    # Stored content was scanned when first uploaded; a duplicate is still
+    # streamed and hashed, so only a client holding the bytes can reference them
+    part_size = TRANSFER_CONFIG.multipart_chunksize
+    validator = StreamingValidator(
+        request.mime_type,
+        request.file_name,
+        part_size,
+        virus_scan=existing is None
+    )
+    upload_id = None
+    finalizing = None
+    
+    loop = asyncio.get_running_loop()
+    
+    # Up to max_concurrency parts upload at once, bounding the chunks held in memory
+    part_uploads: List[asyncio.Task] = []
+    part_slots = asyncio.Semaphore(TRANSFER_CONFIG.max_concurrency)
+    
+    async def upload_part(part_number: int, chunk: bytes) -> Dict[str, Any]:
+        try:
+            return await storage_service.upload_part(storage_path, upload_id, part_number, chunk)
+        finally:
+            part_slots.release()
+    
+    try:
+        # Stream file content into an S3 multipart upload; each chunk is validated
+        # while earlier parts upload, and only uploaded once it passed
+        while chunk := await file.read(part_size):
+            is_valid, error_msg = await loop.run_in_executor(
+                validator_pool, validator.update, chunk
+            )
+            if not is_valid:
+                UPLOAD_FAILED.inc()
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File validation failed: {error_msg}"
+                )
+            
+            if existing is not None:
+                continue
+            if upload_id is None:
+                upload_id = await storage_service.create_multipart_upload(
+                    storage_path,
+                    request.mime_type,
+                    request.application_id,
+                    expected_hash
+                )
+            await part_slots.acquire()
+            part_uploads.append(asyncio.create_task(upload_part(len(part_uploads) + 1, chunk)))
         
+        # Complete validation (size, virus scan) before the object becomes visible;
+        # the scan reads the spool while the last parts are still uploading
+        finalizing = loop.run_in_executor(validator_pool, validator.finalize)
+        await asyncio.wait([finalizing, *part_uploads])
+        is_valid, error_msg, metadata = finalizing.result()
         if not is_valid:
-            document_metrics.labels(operation='upload', status='failed').inc()
+            UPLOAD_FAILED.inc()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"File validation failed: {error_msg}"
             )
-            
-        # Upload to storage
-        document = storage_service.upload_file(
-            file_content,
-            metadata['sanitized_filename'],
-            request.mime_type,
-            request.application_id
-        )
+        parts = [task.result() for task in part_uploads]
+        
+        # Verify the client-supplied checksum against the hash computed while streaming
+        if metadata['file_hash'] != expected_hash:
+            UPLOAD_FAILED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File validation failed: checksum mismatch"
+            )
+        
+        # Validate the document record before the object becomes visible, so a
+        # rejected record never leaves an unreferenced object behind
+        try:
+            document = storage_service.build_document(
+                document_id,
+                request.application_id,
+                metadata['sanitized_filename'],
+                request.mime_type,
+                storage_path,
+                metadata['file_size_bytes']
+            )
+        except mongoengine.ValidationError as e:
+            UPLOAD_FAILED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File validation failed: {str(e)}"
+            )
+        
+        if upload_id is not None:
+            await storage_service.complete_multipart_upload(
+                storage_path,
+                upload_id,
+                parts
+            )
+            upload_id = None
+        else:
+            logger.info(f"Reusing stored content: {storage_path}")
+        
+        # The document record now holds the reference
+        await storage_service.insert_document(document)
+        referenced = False
         
         # Create response
-        response = DocumentResponse(
+        response = DocumentResponse.model_construct(
             id=document.id,
             application_id=document.application_id,
             file_name=document.file_name,
@@ -130,72 +389,104 @@ async def upload_document(
             status=document.status.value,
             verification_status=document.verification_status.value,
             uploaded_at=document.uploaded_at,
-            encryption_status="AES-256-GCM",
+            encryption_status=ENCRYPTION_STATUS,
             last_accessed=None,
             access_count=0
         )
         
         # Record metrics
-        document_metrics.labels(operation='upload', status='success').inc()
-        operation_latency.labels(operation='upload').observe(time.time() - start_time)
+        UPLOAD_SUCCESS.inc()
+        UPLOAD_LATENCY.observe(time.perf_counter() - start_time)
         
         logger.info(f"Document uploaded successfully: {document.id}")
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
-        document_metrics.labels(operation='upload', status='failed').inc()
+        UPLOAD_FAILED.inc()
         logger.error(f"Document upload failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+    finally:
+        # The spool must outlive a scan that is still reading it
+        if finalizing is not None:
+            await asyncio.wait([finalizing])
+        validator.close()
+        # Stop parts still in flight, then discard the uploaded ones if the
+        # upload did not complete
+        for task in part_uploads:
+            task.cancel()
+        await asyncio.gather(*part_uploads, return_exceptions=True)
+        if upload_id is not None:
+            await storage_service.abort_multipart_upload(
+                storage_path,
+                upload_id
+            )
+        # Without a document record, drop the reference; the last one also
+        # deletes stored content that nothing else refers to
+        if referenced:
+            try:
+                await storage_service.release_reference(storage_path, document_id)
+            except Exception as e:
+                logger.error(f"Reference release failed: {str(e)}")
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
-    document_id: UUID4,
+    document_id: uuid.UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     token: str = Depends(validate_token)
 ):
     """
     Retrieve document metadata with security checks.
+    Returns 304 Not Modified when If-None-Match matches the current ETag.
     
     Args:
         document_id: Document UUID
+        response: Outgoing response, used to set the ETag header
+        if_none_match: Conditional request header
         token: Authentication token
         
     Returns:
         DocumentResponse: Document metadata
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
-        document = Document.objects(id=document_id).first()
+        document = await find_document(document_id)
         if not document:
-            document_metrics.labels(operation='get', status='failed').inc()
+            GET_FAILED.inc()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Document not found"
             )
+
+        # Skip building and serializing the body if the client copy is current
+        etag = document_etag(document)
+        if etag_matches(etag, if_none_match):
+            GET_SUCCESS.inc()
+            GET_LATENCY.observe(time.perf_counter() - start_time)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
             
-        response = DocumentResponse(
-            id=document.id,
-            application_id=document.application_id,
-            file_name=document.file_name,
-            mime_type=document.mime_type,
-            status=document.status.value,
-            verification_status=document.verification_status.value,
-            uploaded_at=document.uploaded_at,
-            encryption_status="AES-256-GCM",
-            last_accessed=datetime.utcnow().isoformat(),
+        response.headers["ETag"] = etag
+        document_response = build_document_response(
+            document,
+            last_accessed=datetime.utcnow(),
             access_count=1  # Would be incremented from actual storage
         )
         
-        document_metrics.labels(operation='get', status='success').inc()
-        operation_latency.labels(operation='get').observe(time.time() - start_time)
+        GET_SUCCESS.inc()
+        GET_LATENCY.observe(time.perf_counter() - start_time)
         
-        return response
+        return document_response
         
+    except HTTPException:
+        raise
     except Exception as e:
-        document_metrics.labels(operation='get', status='failed').inc()
+        GET_FAILED.inc()
         logger.error(f"Document retrieval failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -204,7 +495,7 @@ async def get_document(
 
 @router.get("/{document_id}/download")
 async def download_document(
-    document_id: UUID4,
+    document_id: uuid.UUID,
     token: str = Depends(validate_token)
 ):
     """
@@ -217,35 +508,38 @@ async def download_document(
     Returns:
         dict: Presigned URL and metadata
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
-        document = Document.objects(id=document_id).first()
+        document = await find_document(document_id)
         if not document:
-            document_metrics.labels(operation='download', status='failed').inc()
+            DOWNLOAD_FAILED.inc()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Document not found"
             )
             
         # Generate presigned URL
-        url = storage_service.generate_presigned_url(
-            document.storage_path,
-            service_config['service_config']['presigned_url_expiry']
+        # Cached URLs may have less than the configured expiry left
+        url, expires_in = await storage_service.generate_presigned_url_with_expiry(
+            document["storage_path"],
+            SERVICE_CONFIG.presigned_url_expiry
         )
         
-        document_metrics.labels(operation='download', status='success').inc()
-        operation_latency.labels(operation='download').observe(time.time() - start_time)
+        DOWNLOAD_SUCCESS.inc()
+        DOWNLOAD_LATENCY.observe(time.perf_counter() - start_time)
         
         return {
             "download_url": url,
-            "expires_in": service_config['service_config']['presigned_url_expiry'],
-            "file_name": document.file_name,
-            "mime_type": document.mime_type
+            "expires_in": expires_in,
+            "file_name": document["file_name"],
+            "mime_type": document["mime_type"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        document_metrics.labels(operation='download', status='failed').inc()
+        DOWNLOAD_FAILED.inc()
         logger.error(f"Download URL generation failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -254,7 +548,7 @@ async def download_document(
 
 @router.delete("/{document_id}")
 async def delete_document(
-    document_id: UUID4,
+    document_id: uuid.UUID,
     token: str = Depends(validate_token)
 ):
     """
@@ -267,27 +561,29 @@ async def delete_document(
     Returns:
         dict: Deletion confirmation
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
-        document = Document.objects(id=document_id).first()
+        document = await find_document(document_id)
         if not document:
-            document_metrics.labels(operation='delete', status='failed').inc()
+            DELETE_FAILED.inc()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Document not found"
             )
             
         # Delete from storage
-        storage_service.delete_file(document.storage_path)
+        await storage_service.delete_file(document["storage_path"], document["_id"])
         
-        document_metrics.labels(operation='delete', status='success').inc()
-        operation_latency.labels(operation='delete').observe(time.time() - start_time)
+        DELETE_SUCCESS.inc()
+        DELETE_LATENCY.observe(time.perf_counter() - start_time)
         
         return {"message": "Document deleted successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        document_metrics.labels(operation='delete', status='failed').inc()
+        DELETE_FAILED.inc()
         logger.error(f"Document deletion failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -296,7 +592,7 @@ async def delete_document(
 
 @router.put("/{document_id}/verify")
 async def verify_document(
-    document_id: UUID4,
+    document_id: uuid.UUID,
     token: str = Depends(validate_token)
 ):
     """
@@ -309,41 +605,39 @@ async def verify_document(
     Returns:
         DocumentResponse: Updated document metadata
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
-        document = Document.objects(id=document_id).first()
+        document = await find_document(document_id)
         if not document:
-            document_metrics.labels(operation='verify', status='failed').inc()
+            VERIFY_FAILED.inc()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Document not found"
             )
-            
-        # Update verification status
-        document.verification_status = VerificationStatus.VERIFIED
-        document.save()
         
-        response = DocumentResponse(
-            id=document.id,
-            application_id=document.application_id,
-            file_name=document.file_name,
-            mime_type=document.mime_type,
-            status=document.status.value,
-            verification_status=document.verification_status.value,
-            uploaded_at=document.uploaded_at,
-            encryption_status="AES-256-GCM",
-            last_accessed=datetime.utcnow().isoformat(),
+        # Update verification status as part of the next batched write
+        await document_writer.add(UpdateOne(
+            {"_id": document["_id"]},
+            {"$set": {"verification_status": VerificationStatus.VERIFIED.value}}
+        ))
+        document["verification_status"] = VerificationStatus.VERIFIED.value
+        
+        response = build_document_response(
+            document,
+            last_accessed=datetime.utcnow(),
             access_count=1
         )
         
-        document_metrics.labels(operation='verify', status='success').inc()
-        operation_latency.labels(operation='verify').observe(time.time() - start_time)
+        VERIFY_SUCCESS.inc()
+        VERIFY_LATENCY.observe(time.perf_counter() - start_time)
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
-        document_metrics.labels(operation='verify', status='failed').inc()
+        VERIFY_FAILED.inc()
         logger.error(f"Document verification failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,130 @@
+"""
+Response compression middleware for the Document Service.
+Negotiates zstd, Brotli or gzip from Accept-Encoding and compresses buffered response bodies.
+
+Version: 1.0.0
+"""
+
+import asyncio
+import gzip
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+import brotli  # version: 1.1.0
+import zstandard  # version: 0.22.0
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Per-thread zstd contexts; a ZstdCompressor must not be shared across threads
+_zstd_local = threading.local()
+
+def _zstd_compress(body: bytes) -> bytes:
+    compressor = getattr(_zstd_local, "compressor", None)
+    if compressor is None:
+        compressor = _zstd_local.compressor = zstandard.ZstdCompressor(level=3)
+    return compressor.compress(body)
+
+# Supported encodings in server preference order
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "zstd": _zstd_compress,
+    "br": lambda body: brotli.compress(body, quality=4),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6)
+}
+
+@lru_cache(maxsize=256)
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the preferred supported encoding accepted by the client.
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+
+    Returns:
+        Optional[str]: Encoding name, or None if no supported encoding is accepted
+    """
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        quality = 1.0
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        qualities[coding.strip()] = quality
+
+    # "*" only covers encodings the client did not list; an explicit q=0 refuses
+    wildcard = qualities.get("*", 0)
+    for encoding in COMPRESSORS:
+        if qualities.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete response bodies with the negotiated encoding.
+    Streaming responses and bodies below minimum_size are passed through untouched;
+    bodies of at least offload_size are compressed off the event loop.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 512, offload_size: int = 64 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if message.get("more_body", False):
+                # Streaming response: forward as-is rather than buffering it all
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            await self._send_body(send, start_message, message.get("body", b""), encoding)
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _send_body(self, send: Send, start_message: Message, body: bytes,
+                         encoding: str) -> None:
+        """Compress the buffered body if worthwhile and emit the response."""
+        headers = MutableHeaders(scope=start_message)
+        if len(body) >= self.minimum_size and "content-encoding" not in headers:
+            compress = COMPRESSORS[encoding]
+            if len(body) >= self.offload_size:
+                body = await asyncio.to_thread(compress, body)
+            else:
+                body = compress(body)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
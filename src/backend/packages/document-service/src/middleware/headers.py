@@ -0,0 +1,55 @@
+"""
+Response header middleware for the Document Service.
+Adds security headers and propagates the request ID in a single ASGI layer.
+
+Version: 1.0.0
+"""
+
+from typing import List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.ids import uuid7
+
+# Constant security headers, encoded once at import
+_SEC_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains")
+]
+
+class HeadersMiddleware:
+    """
+    ASGI middleware attaching security headers and X-Request-ID to every response.
+    The request ID is taken from the incoming X-Request-ID header when present and
+    exposed to handlers as request.state.request_id.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value
+                break
+        if request_id is None:
+            request_id = uuid7().hex.encode("latin-1")
+        scope.setdefault("state", {})["request_id"] = request_id.decode("latin-1")
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = message.setdefault("headers", [])
+                if not isinstance(headers, list):
+                    headers = message["headers"] = list(headers)
+                headers.extend(_SEC_HEADERS)
+                headers.append((b"x-request-id", request_id))
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
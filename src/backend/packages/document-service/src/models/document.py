@@ -8,10 +8,16 @@ Author: Enrollment System Team
 
 from datetime import datetime, timezone
 from enum import Enum
+from functools import cached_property
 import uuid
 import re
-from typing import Dict, Any, Optional
+import warnings
+from typing import Dict, Any, Iterable, Optional
 import mongoengine  # version 0.27.0
+import orjson  # version 3.9.0
+
+from utils.ids import uuid7
+from utils.paths import STORAGE_PATH_PREFIX, is_safe_storage_path
 
 # Security-vetted list of allowed MIME types
 ALLOWED_MIME_TYPES = [
@@ -22,9 +28,16 @@ ALLOWED_MIME_TYPES = [
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
 ]
 
+# Characters replaced when deriving a storage path from a file name
+_UNSAFE_FILENAME = re.compile(r'[^a-zA-Z0-9._-]')
+
 # Maximum file size in MB (50MB limit for security)
 MAX_FILE_SIZE_MB = 50
 
+# Lookup forms of the limits above used by Document.validate
+_ALLOWED_MIME_TYPES = frozenset(ALLOWED_MIME_TYPES)
+_MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+
 class DocumentStatus(Enum):
     """
     Enumeration of possible document statuses for lifecycle tracking.
@@ -42,7 +55,6 @@ class VerificationStatus(Enum):
     VERIFIED = "verified"
     REJECTED = "rejected"
 
-@mongoengine.Document
 class Document(mongoengine.Document):
     """
     Enhanced MongoDB document model for secure document metadata storage.
@@ -72,7 +84,9 @@ class Document(mongoengine.Document):
             'status',
             'verification_status',
             ('application_id', 'status'),
-            {'fields': ['uploaded_at'], 'expireAfterSeconds': 365 * 24 * 60 * 60}  # 1 year TTL
+            {'fields': ['uploaded_at'], 'expireAfterSeconds': 365 * 24 * 60 * 60},  # 1 year TTL
+            # Not unique: documents with identical content share one object
+            'storage_path'
         ],
         'ordering': ['-uploaded_at']
     }
@@ -85,25 +99,27 @@ class Document(mongoengine.Document):
             **kwargs: Document field values
         """
         # Set secure defaults for required fields
-        kwargs['id'] = kwargs.get('id', uuid.uuid4())
+        kwargs['id'] = kwargs.get('id', uuid7())
         kwargs['status'] = kwargs.get('status', DocumentStatus.PENDING)
         kwargs['verification_status'] = kwargs.get('verification_status', VerificationStatus.UNVERIFIED)
         kwargs['uploaded_at'] = kwargs.get('uploaded_at', datetime.now(timezone.utc))
         
         # Generate secure storage path if not provided
         if 'storage_path' not in kwargs:
-            safe_filename = re.sub(r'[^a-zA-Z0-9._-]', '_', kwargs.get('file_name', ''))
-            kwargs['storage_path'] = f"documents/{kwargs['id']}/{safe_filename}"
+            safe_filename = _UNSAFE_FILENAME.sub('_', kwargs.get('file_name', ''))
+            kwargs['storage_path'] = f"{STORAGE_PATH_PREFIX}{kwargs['id']}/{safe_filename}"
         
         super().__init__(**kwargs)
 
-    @classmethod
-    def validate(cls, document: 'Document') -> bool:
+    def validate(self, clean: bool = True) -> bool:
         """
         Comprehensive validation of document metadata with enhanced security checks.
+        Field constraints are enforced by mongoengine first; the security checks
+        then run in a single pass and stop at the first failure. Overrides
+        mongoengine's validate(), so save() runs the same checks.
         
         Args:
-            document: Document instance to validate
+            clean: Run the clean() hook, as mongoengine's save() requests
             
         Returns:
             bool: Validation result
@@ -111,52 +127,67 @@ class Document(mongoengine.Document):
         Raises:
             ValidationError: If validation fails with detailed error context
         """
-        try:
-            # Validate file name security
-            if not document.file_name or '..' in document.file_name or '/' in document.file_name:
-                raise mongoengine.ValidationError("Invalid file name")
-            
-            # Validate MIME type
-            if document.mime_type not in ALLOWED_MIME_TYPES:
-                raise mongoengine.ValidationError(f"Unsupported MIME type: {document.mime_type}")
-            
-            # Validate file size
-            if not 0 <= document.file_size <= MAX_FILE_SIZE_MB * 1024 * 1024:
-                raise mongoengine.ValidationError(f"File size exceeds {MAX_FILE_SIZE_MB}MB limit")
-            
-            # Validate storage path security
-            if not document.storage_path.startswith("documents/") or '..' in document.storage_path:
-                raise mongoengine.ValidationError("Invalid storage path")
-            
-            # Validate UUIDs
-            try:
-                uuid.UUID(str(document.id))
-                uuid.UUID(str(document.application_id))
-            except ValueError:
-                raise mongoengine.ValidationError("Invalid UUID format")
-            
-            # Validate status fields
-            if not isinstance(document.status, DocumentStatus):
-                raise mongoengine.ValidationError("Invalid document status")
-            if not isinstance(document.verification_status, VerificationStatus):
-                raise mongoengine.ValidationError("Invalid verification status")
-            
-            # Validate timestamp
-            if not document.uploaded_at or document.uploaded_at.tzinfo != timezone.utc:
-                raise mongoengine.ValidationError("Invalid upload timestamp")
-            
-            return True
-            
-        except Exception as e:
-            raise mongoengine.ValidationError(f"Document validation failed: {str(e)}")
+        # Field constraints (required, max_length, choices, ranges) and clean()
+        super().validate(clean=clean)
+        
+        # Validate file name security
+        file_name = self.file_name
+        if not file_name or '..' in file_name or '/' in file_name:
+            raise mongoengine.ValidationError("Document validation failed: Invalid file name")
+        
+        # Validate MIME type
+        if self.mime_type not in _ALLOWED_MIME_TYPES:
+            raise mongoengine.ValidationError(
+                f"Document validation failed: Unsupported MIME type: {self.mime_type}"
+            )
+        
+        # Validate file size
+        if not 0 <= self.file_size <= _MAX_FILE_SIZE_BYTES:
+            raise mongoengine.ValidationError(
+                f"Document validation failed: File size exceeds {MAX_FILE_SIZE_MB}MB limit"
+            )
+        
+        # Validate storage path security
+        if not is_safe_storage_path(self.storage_path):
+            raise mongoengine.ValidationError("Document validation failed: Invalid storage path")
+        
+        # Validate UUIDs
+        if not isinstance(self.id, uuid.UUID) or not isinstance(self.application_id, uuid.UUID):
+            raise mongoengine.ValidationError("Document validation failed: Invalid UUID format")
+        
+        # Validate status fields
+        if type(self.status) is not DocumentStatus:
+            raise mongoengine.ValidationError("Document validation failed: Invalid document status")
+        if type(self.verification_status) is not VerificationStatus:
+            raise mongoengine.ValidationError("Document validation failed: Invalid verification status")
+        
+        # Validate timestamp
+        uploaded_at = self.uploaded_at
+        if not uploaded_at or uploaded_at.tzinfo != timezone.utc:
+            raise mongoengine.ValidationError("Document validation failed: Invalid upload timestamp")
+        
+        return True
+
+    @cached_property
+    def _uploaded_iso(self) -> str:
+        """ISO 8601 upload timestamp, formatted once per instance."""
+        return self.uploaded_at.isoformat()
 
     def to_dict(self) -> Dict[str, Any]:
         """
         Converts document model to secure dictionary representation.
         
+        Deprecated: use to_orjson_dict() or dumps_many(), which leave UUIDs and
+        timestamps for orjson to encode.
+        
         Returns:
             Dict[str, Any]: Sanitized document data dictionary
         """
+        warnings.warn(
+            "Document.to_dict is deprecated; use to_orjson_dict or dumps_many",
+            DeprecationWarning,
+            stacklevel=2
+        )
         return {
             'id': str(self.id),
             'application_id': str(self.application_id),
@@ -164,11 +195,44 @@ class Document(mongoengine.Document):
             'mime_type': self.mime_type,
             'storage_path': self.storage_path,
             'file_size': self.file_size,
-            'uploaded_at': self.uploaded_at.isoformat(),
+            'uploaded_at': self._uploaded_iso,
+            'status': self.status.value,
+            'verification_status': self.verification_status.value
+        }
+
+    def to_orjson_dict(self) -> Dict[str, Any]:
+        """
+        Converts document model to a dictionary for orjson serialization.
+        UUIDs and the upload timestamp are left as native types.
+        
+        Returns:
+            Dict[str, Any]: Sanitized document data dictionary
+        """
+        return {
+            'id': self.id,
+            'application_id': self.application_id,
+            'file_name': self.file_name,
+            'mime_type': self.mime_type,
+            'storage_path': self.storage_path,
+            'file_size': self.file_size,
+            'uploaded_at': self.uploaded_at,
             'status': self.status.value,
-            'verification_status': self.verification_status.value,
-            'metadata': {
-                'created_at': self.uploaded_at.isoformat(),
-                'last_modified': datetime.now(timezone.utc).isoformat()
-            }
-        }
\ No newline at end of file
+            'verification_status': self.verification_status.value
+        }
+
+    @staticmethod
+    def dumps_many(documents: Iterable['Document']) -> bytes:
+        """
+        Serializes documents to a JSON array.
+        Timestamps loaded from MongoDB are naive UTC and are encoded as such.
+        
+        Args:
+            documents: Documents to serialize
+            
+        Returns:
+            bytes: UTF-8 encoded JSON
+        """
+        return orjson.dumps(
+            [document.to_orjson_dict() for document in documents],
+            option=orjson.OPT_NAIVE_UTC
+        )
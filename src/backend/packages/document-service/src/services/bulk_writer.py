@@ -0,0 +1,132 @@
+"""
+Batched MongoDB writer for document metadata.
+Coalesces concurrent inserts and updates into unordered bulk_write calls.
+
+Version: 1.0.0
+"""
+
+import asyncio
+import logging
+from typing import Any, List, Optional, Set, Tuple, Union
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from models.document import Document
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WriteOp = Union[InsertOne, UpdateOne]
+
+class BulkDocumentWriter:
+    """
+    Accumulates write operations against the documents collection and flushes
+    them with a single bulk_write once flush_every operations are pending or
+    flush_interval_s has passed since the first one was added.
+    Each add() resolves when its own operation has been written, so callers
+    keep per-request error handling.
+    """
+
+    def __init__(self, flush_every: int = 500, flush_interval_s: float = 0.25):
+        """
+        Initialize an empty writer.
+
+        Args:
+            flush_every: Pending operation count that triggers an immediate flush
+            flush_interval_s: Maximum time an operation waits for its batch
+        """
+        self._flush_every = flush_every
+        self._flush_interval_s = flush_interval_s
+        self._pending: List[Tuple[WriteOp, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "BulkDocumentWriter":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def add(self, op: WriteOp) -> None:
+        """
+        Queue a write operation and wait until its batch has been written.
+
+        Args:
+            op: pymongo InsertOne or UpdateOne operation
+
+        Raises:
+            OperationFailure: If this operation failed within the batch
+            PyMongoError: If the whole batch failed
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((op, future))
+
+        if len(self._pending) >= self._flush_every:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._flush_interval_s, self._schedule_flush)
+
+        await future
+
+    async def flush(self) -> None:
+        """Write all pending operations and wait for in-flight batches."""
+        self._schedule_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Flush remaining operations before shutdown."""
+        await self.flush()
+
+    def _schedule_flush(self) -> None:
+        """Hand the pending batch to a background flush task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[WriteOp, asyncio.Future]]) -> None:
+        """Write one batch and resolve each caller's future."""
+        failed = {}
+        try:
+            await asyncio.to_thread(
+                Document._get_collection().bulk_write,
+                [op for op, _ in batch],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            # Unordered batches apply every operation that did not fail
+            failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+            logger.error(f"Bulk write of {len(batch)} operations had {len(failed)} failures")
+            if not failed:
+                self._fail_batch(batch, e)
+                return
+        except Exception as e:
+            logger.error(f"Bulk write of {len(batch)} operations failed: {str(e)}")
+            self._fail_batch(batch, e)
+            return
+
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            error = failed.get(index)
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(OperationFailure(error.get('errmsg'), error.get('code'), error))
+
+    @staticmethod
+    def _fail_batch(batch: List[Tuple[WriteOp, asyncio.Future]], exc: Exception) -> None:
+        """Propagate a batch-wide failure to every caller."""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+__all__ = ['BulkDocumentWriter']
@@ -0,0 +1,142 @@
+"""
+Reference tracking for content-addressed storage objects.
+Records which documents share an object so the last reference can delete it
+without racing uploads that are about to reuse it.
+
+Version: 1.0.0
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from models.document import Document
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Collection holding one record per shared object:
+# {_id: storage_path, holders: [document ids], deleting_at: tombstone time or None}
+REFERENCES_COLLECTION = 'storage_refs'
+
+# A tombstone older than this is left by a deleter that died; new holders reclaim it
+TOMBSTONE_TIMEOUT = timedelta(minutes=10)
+
+# Attempts, and the first delay between them, while a delete holds the tombstone
+ACQUIRE_ATTEMPTS = 5
+ACQUIRE_BACKOFF_SECONDS = 0.1
+
+class StorageReferences:
+    """
+    Atomic reference sets for shared storage objects.
+    Holders are added and removed with single-document updates; the holder that
+    empties a set claims a tombstone before deleting the object, and acquire()
+    refuses to join a set while its tombstone is in place.
+    Document ids are used as holders, so retried acquires and releases are idempotent.
+    """
+
+    @staticmethod
+    def _collection() -> Any:
+        """References collection in the documents database."""
+        return Document._get_db()[REFERENCES_COLLECTION]
+
+    async def acquire(self, storage_path: str, holder: str) -> None:
+        """
+        Add a holder to the object's reference set, creating the set if needed.
+
+        Args:
+            storage_path: S3 storage path of the shared object
+            holder: Document ID taking the reference
+
+        Raises:
+            RuntimeError: If a delete of the object is still in progress after all attempts
+        """
+        collection = self._collection()
+        for attempt in range(ACQUIRE_ATTEMPTS):
+            try:
+                # Matches only a live set; against a tombstone the upsert collides on _id
+                await asyncio.to_thread(
+                    collection.update_one,
+                    {'_id': storage_path, 'deleting_at': None},
+                    {'$addToSet': {'holders': holder}},
+                    upsert=True
+                )
+                return
+            except DuplicateKeyError:
+                stale_before = datetime.now(timezone.utc) - TOMBSTONE_TIMEOUT
+                reclaimed = await asyncio.to_thread(
+                    collection.update_one,
+                    {'_id': storage_path, 'deleting_at': {'$lt': stale_before}},
+                    {'$set': {'holders': [holder]}, '$unset': {'deleting_at': ''}}
+                )
+                if reclaimed.modified_count:
+                    logger.warning(f"Reclaimed stale storage tombstone: {storage_path}")
+                    return
+                await asyncio.sleep(ACQUIRE_BACKOFF_SECONDS * 2 ** attempt)
+
+        raise RuntimeError(f"Storage object is being deleted: {storage_path}")
+
+    async def release(self, storage_path: str, holder: str) -> Optional[datetime]:
+        """
+        Remove a holder and, if it was the last one, claim the delete tombstone.
+
+        Args:
+            storage_path: S3 storage path of the shared object
+            holder: Document ID dropping the reference
+
+        Returns:
+            Optional[datetime]: Tombstone time if the caller must delete the object
+        """
+        collection = self._collection()
+        references = await asyncio.to_thread(
+            collection.find_one_and_update,
+            {'_id': storage_path, 'deleting_at': None},
+            {'$pull': {'holders': holder}},
+            return_document=ReturnDocument.AFTER
+        )
+        if references is None or references['holders']:
+            return None
+
+        # Claimed only if no holder joined since the pull; MongoDB keeps
+        # milliseconds, so truncate to match the stored tombstone later
+        now = datetime.now(timezone.utc)
+        deleting_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        claimed = await asyncio.to_thread(
+            collection.update_one,
+            {'_id': storage_path, 'holders': {'$size': 0}, 'deleting_at': None},
+            {'$set': {'deleting_at': deleting_at}}
+        )
+        return deleting_at if claimed.modified_count else None
+
+    async def finish_delete(self, storage_path: str, deleting_at: datetime) -> None:
+        """
+        Drop the reference set once its object has been deleted.
+
+        Args:
+            storage_path: S3 storage path of the deleted object
+            deleting_at: Tombstone time returned by release()
+        """
+        await asyncio.to_thread(
+            self._collection().delete_one,
+            {'_id': storage_path, 'deleting_at': deleting_at}
+        )
+
+    async def abandon_delete(self, storage_path: str, deleting_at: datetime) -> None:
+        """
+        Lift a tombstone whose object could not be deleted, so the set can be reused.
+
+        Args:
+            storage_path: S3 storage path of the object
+            deleting_at: Tombstone time returned by release()
+        """
+        await asyncio.to_thread(
+            self._collection().update_one,
+            {'_id': storage_path, 'deleting_at': deleting_at},
+            {'$unset': {'deleting_at': ''}}
+        )
+
+__all__ = ['StorageReferences']
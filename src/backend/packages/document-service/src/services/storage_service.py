@@ -5,43 +5,100 @@ Implements comprehensive file operations with encryption, access control, and er
 Version: 1.0.0
 """
 
-import boto3  # version: 1.26.0
+import aioboto3  # version: 11.3.0
+import asyncio
 import botocore  # version: 1.29.0
+import hashlib
+import io
 import logging
+import threading
+import time
 import uuid
-from typing import Tuple, Optional
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Tuple, Optional, Union
+from boto3.s3.transfer import TransferConfig  # version: 1.28.0
 from botocore.exceptions import ClientError
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from cachetools import TLRUCache  # version: 5.3.0
+from pymongo import InsertOne, UpdateOne
 
 from config import storage_config
 from models.document import Document, DocumentStatus, VerificationStatus
-from utils.file_validator import validate_file, generate_file_hash
+from services.bulk_writer import BulkDocumentWriter
+from services.storage_refs import StorageReferences
+from utils.file_validator import (
+    HASH_READ_SIZE, validate_file, generate_file_hash, sanitize_filename
+)
+from utils.ids import uuid7
+from utils.paths import STORAGE_PATH_PREFIX, assert_safe_storage_path
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-class StorageService:
+# Objects of at least multipart_threshold bytes are transferred as concurrent
+# multipart_chunksize parts; smaller ones use a single request
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+# Uploaded content is stored once under its hash and shared by every document
+# with identical bytes
+DEDUPE_PREFIX = f'{STORAGE_PATH_PREFIX}by-hash/'
+
+# Cached pre-signed URLs are evicted this many seconds before they expire
+PRESIGNED_URL_CACHE_MARGIN_SECONDS = 60
+
+def _presigned_url_ttu(key: Tuple[str, int], value: Tuple[str, float], now: float) -> float:
+    """Expire a cached (url, expires_at) pair ahead of the URL's own expiry."""
+    return value[1] - PRESIGNED_URL_CACHE_MARGIN_SECONDS
+
+class AsyncStorageService:
     """
     Service class for managing secure document storage operations in S3 and MongoDB.
     Implements comprehensive security measures and error handling.
+    All S3 calls are non-blocking; the client is opened on first use and
+    shared until close().
     """
 
-    def __init__(self):
-        """Initialize storage service with AWS credentials and encryption settings."""
+    # Buckets whose configuration was verified, keyed by (bucket, region), with the
+    # monotonic time of the check; shared by all instances in the process
+    BUCKET_VERIFICATION_TTL_SECONDS = 3600
+    _verified_buckets: Dict[Tuple[str, str], float] = {}
+    _verified_buckets_lock = threading.Lock()
+
+    def __init__(self, bulk_writer: Optional[BulkDocumentWriter] = None):
+        """
+        Initialize storage service with AWS credentials and encryption settings.
+        
+        Args:
+            bulk_writer: Batched writer for document metadata; a private one is
+                created if not given
+        """
         try:
-            # Initialize S3 client with credentials
-            self._s3_client = boto3.client(
-                's3',
+            self._bulk_writer = bulk_writer or BulkDocumentWriter()
+            self._references = StorageReferences()
+            
+            # S3 session with credentials; the client itself is opened lazily
+            self._session = aioboto3.Session(
                 aws_access_key_id=storage_config['aws_access_key_id'],
                 aws_secret_access_key=storage_config['aws_secret_access_key'],
                 region_name=storage_config['aws_region']
             )
+            self._s3_client = None
+            self._exit_stack = AsyncExitStack()
+            self._client_lock = asyncio.Lock()
             
             self._bucket_name = storage_config['bucket_name']
             self._encryption_algorithm = storage_config['encryption_algorithm']
-            
-            # Verify bucket existence and encryption
-            self._verify_bucket_configuration()
+
+            # Per-worker cache of (signed URL, monotonic expiry time) keyed by
+            # (storage_path, expiry_seconds), and the signing tasks in flight for
+            # keys not cached yet
+            self._presigned_url_cache = TLRUCache(maxsize=10_000, ttu=_presigned_url_ttu)
+            self._presigned_url_pending: Dict[Tuple[str, int], asyncio.Future] = {}
             
             logger.info("Storage service initialized successfully")
             
@@ -49,80 +106,367 @@ class StorageService:
             logger.error(f"Failed to initialize storage service: {str(e)}")
             raise
 
-    def _verify_bucket_configuration(self) -> None:
-        """Verify S3 bucket existence and encryption configuration."""
+    async def _client(self) -> Any:
+        """
+        Return the shared S3 client, opening it and verifying the bucket on first use.
+        
+        Returns:
+            Any: Open aiobotocore S3 client
+        """
+        if self._s3_client is None:
+            async with self._client_lock:
+                if self._s3_client is None:
+                    client = await self._exit_stack.enter_async_context(
+                        self._session.client('s3')
+                    )
+                    await self._verify_bucket_configuration(client)
+                    self._s3_client = client
+        return self._s3_client
+
+    async def close(self) -> None:
+        """Close the shared S3 client and its connection pool."""
+        await self._exit_stack.aclose()
+        self._s3_client = None
+
+    async def _verify_bucket_configuration(self, client: Any) -> None:
+        """
+        Verify S3 bucket existence and encryption configuration.
+        Skipped if the same bucket was verified within BUCKET_VERIFICATION_TTL_SECONDS.
+        """
+        cache_key = (self._bucket_name, storage_config['aws_region'])
+        with self._verified_buckets_lock:
+            verified_at = self._verified_buckets.get(cache_key)
+        if (verified_at is not None
+                and time.monotonic() - verified_at < self.BUCKET_VERIFICATION_TTL_SECONDS):
+            return
+        
         try:
-            self._s3_client.head_bucket(Bucket=self._bucket_name)
+            await client.head_bucket(Bucket=self._bucket_name)
             
             # Verify bucket encryption
-            encryption = self._s3_client.get_bucket_encryption(Bucket=self._bucket_name)
+            encryption = await client.get_bucket_encryption(Bucket=self._bucket_name)
             if not encryption.get('ServerSideEncryptionConfiguration'):
                 raise ValueError("Bucket encryption not configured")
+            
+            with self._verified_buckets_lock:
+                self._verified_buckets[cache_key] = time.monotonic()
                 
         except ClientError as e:
             logger.error(f"Bucket configuration error: {str(e)}")
             raise
 
+    @staticmethod
+    def content_storage_path(file_hash: str) -> str:
+        """
+        Build the S3 key under which content with the given hash is stored.
+        
+        Args:
+            file_hash: SHA-256 hex digest of the content
+            
+        Returns:
+            str: S3 storage path
+        """
+        return f"{DEDUPE_PREFIX}{file_hash}"
+
+    def build_document(self, document_id: uuid.UUID, application_id: uuid.UUID,
+                       file_name: str, mime_type: str, storage_path: str,
+                       file_size: int) -> Document:
+        """
+        Build and validate the metadata record for an object without persisting it.
+        
+        Args:
+            document_id: Document ID
+            application_id: Associated application ID
+            file_name: Sanitized file name
+            mime_type: File MIME type
+            storage_path: S3 storage path of the object
+            file_size: File size in bytes
+            
+        Returns:
+            Document: Validated document model instance
+            
+        Raises:
+            mongoengine.ValidationError: If the record is invalid
+        """
+        document = Document(
+            id=document_id,
+            application_id=application_id,
+            file_name=file_name,
+            mime_type=mime_type,
+            storage_path=storage_path,
+            file_size=file_size,
+            status=DocumentStatus.UPLOADED,
+            verification_status=VerificationStatus.UNVERIFIED
+        )
+        
+        document.validate()
+        return document
+
+    async def insert_document(self, document: Document) -> None:
+        """
+        Persist a document record returned by build_document.
+        
+        Args:
+            document: Validated document model instance
+            
+        Raises:
+            PyMongoError: If the insert fails
+        """
+        # Insert as part of the next bulk write; save() would re-run field
+        # validation and change tracking on a document that is always new
+        await self._bulk_writer.add(InsertOne(document.to_mongo()))
+
+    async def create_document(self, document_id: uuid.UUID, application_id: uuid.UUID,
+                        file_name: str, mime_type: str, storage_path: str,
+                        file_size: int) -> Document:
+        """
+        Create and persist the metadata record for an uploaded object.
+        
+        Args:
+            document_id: Document ID
+            application_id: Associated application ID
+            file_name: Sanitized file name
+            mime_type: File MIME type
+            storage_path: S3 storage path of the uploaded object
+            file_size: File size in bytes
+            
+        Returns:
+            Document: Created document model instance
+        """
+        document = self.build_document(
+            document_id, application_id, file_name, mime_type, storage_path, file_size
+        )
+        await self.insert_document(document)
+        return document
+
     @retry(
+        retry=retry_if_exception_type(ClientError),
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10)
     )
-    def upload_file(self, file_content: bytes, file_name: str, mime_type: str, 
-                   application_id: uuid.UUID) -> Document:
+    async def create_multipart_upload(self, storage_path: str, mime_type: str,
+                                application_id: uuid.UUID,
+                                file_hash: Optional[str] = None) -> str:
         """
-        Upload document to S3 with encryption and comprehensive validation.
+        Start an encrypted S3 multipart upload for streamed content.
         
         Args:
-            file_content: Raw file content
-            file_name: Original file name
+            storage_path: S3 storage path
             mime_type: File MIME type
             application_id: Associated application ID
+            file_hash: Expected SHA-256 hex digest of the complete content
             
         Returns:
-            Document: Created document model instance
+            str: Multipart upload ID
             
         Raises:
-            ValueError: For validation failures
             ClientError: For S3 operation failures
         """
         try:
-            # Validate file content
-            is_valid, error_msg, metadata = validate_file(file_content, mime_type, file_name)
-            if not is_valid:
-                raise ValueError(f"File validation failed: {error_msg}")
-            
-            # Generate secure document ID and storage path
-            document_id = uuid.uuid4()
-            storage_path = f"documents/{application_id}/{document_id}/{metadata['sanitized_filename']}"
-            
-            # Upload to S3 with server-side encryption
-            self._s3_client.put_object(
+            client = await self._client()
+            response = await client.create_multipart_upload(
                 Bucket=self._bucket_name,
                 Key=storage_path,
-                Body=file_content,
                 ContentType=mime_type,
                 ServerSideEncryption=self._encryption_algorithm,
+                ChecksumAlgorithm='SHA256',
                 Metadata={
-                    'file_hash': metadata['file_hash'],
-                    'application_id': str(application_id)
+                    'application_id': str(application_id),
+                    # The part checksums only yield a composite checksum the SDK
+                    # does not verify, so keep a full-object hash for downloads
+                    **({'file_hash': file_hash} if file_hash else {})
                 }
             )
+            return response['UploadId']
+            
+        except Exception as e:
+            logger.error(f"Multipart upload initiation failed: {str(e)}")
+            raise
+
+    @retry(
+        retry=retry_if_exception_type(ClientError),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10)
+    )
+    async def upload_part(self, storage_path: str, upload_id: str, part_number: int,
+                    chunk: bytes) -> Dict[str, Any]:
+        """
+        Upload one part of a multipart upload.
+        
+        Args:
+            storage_path: S3 storage path
+            upload_id: Multipart upload ID
+            part_number: 1-based part number
+            chunk: Part content
+            
+        Returns:
+            Dict[str, Any]: Part descriptor for complete_multipart_upload
             
-            # Create document record
-            document = Document(
-                id=document_id,
-                application_id=application_id,
-                file_name=metadata['sanitized_filename'],
-                mime_type=mime_type,
-                storage_path=storage_path,
-                file_size=len(file_content),
-                status=DocumentStatus.UPLOADED,
-                verification_status=VerificationStatus.UNVERIFIED
+        Raises:
+            ClientError: For S3 operation failures
+        """
+        try:
+            client = await self._client()
+            response = await client.upload_part(
+                Bucket=self._bucket_name,
+                Key=storage_path,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=chunk,
+                ChecksumAlgorithm='SHA256'
             )
+            return {
+                'ETag': response['ETag'],
+                'PartNumber': part_number,
+                'ChecksumSHA256': response['ChecksumSHA256']
+            }
             
-            # Validate and save document
-            Document.validate(document)
-            document.save()
+        except Exception as e:
+            logger.error(f"Part upload failed: {str(e)}")
+            raise
+
+    @retry(
+        retry=retry_if_exception_type(ClientError),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10)
+    )
+    async def complete_multipart_upload(self, storage_path: str, upload_id: str,
+                                  parts: List[Dict[str, Any]]) -> None:
+        """
+        Complete a multipart upload, making the object visible.
+        
+        Args:
+            storage_path: S3 storage path
+            upload_id: Multipart upload ID
+            parts: Part descriptors returned by upload_part, in order
+            
+        Raises:
+            ClientError: For S3 operation failures
+        """
+        try:
+            client = await self._client()
+            await client.complete_multipart_upload(
+                Bucket=self._bucket_name,
+                Key=storage_path,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+            logger.info(f"Multipart upload completed: {storage_path}")
+            
+        except Exception as e:
+            logger.error(f"Multipart upload completion failed: {str(e)}")
+            raise
+
+    async def abort_multipart_upload(self, storage_path: str, upload_id: str) -> None:
+        """
+        Abort a multipart upload and discard any uploaded parts.
+        
+        Args:
+            storage_path: S3 storage path
+            upload_id: Multipart upload ID
+        """
+        try:
+            client = await self._client()
+            await client.abort_multipart_upload(
+                Bucket=self._bucket_name,
+                Key=storage_path,
+                UploadId=upload_id
+            )
+            logger.info(f"Multipart upload aborted: {storage_path}")
+            
+        except Exception as e:
+            logger.error(f"Multipart upload abort failed: {str(e)}")
+
+    async def reserve_content(self, storage_path: str, document_id: uuid.UUID,
+                              mime_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Take a document's reference on content-addressed storage and look up
+        the object. The reference is taken first, so deleting the last other
+        reference cannot remove the object from under the caller, who must
+        release it unless a document record is created.
+        
+        Args:
+            storage_path: S3 storage path returned by content_storage_path
+            document_id: Document ID taking the reference
+            mime_type: Claimed MIME type of the content
+            
+        Returns:
+            Optional[Dict[str, Any]]: head_object response if the content is
+                already stored, or None if it must be uploaded
+            
+        Raises:
+            ValueError: If the stored content was detected as another MIME type
+            ClientError: For S3 operation failures
+        """
+        await self._references.acquire(storage_path, str(document_id))
+        try:
+            client = await self._client()
+            existing = await self._head_object(client, storage_path)
+            # Identical bytes were validated and scanned when first stored,
+            # under the MIME type they were detected as
+            if existing is not None and existing['ContentType'] != mime_type:
+                raise ValueError(
+                    f"File validation failed: MIME type mismatch: claimed {mime_type}, "
+                    f"detected {existing['ContentType']}"
+                )
+            return existing
+            
+        except Exception:
+            try:
+                await self.release_reference(storage_path, document_id)
+            except Exception as release_error:
+                logger.error(f"Reference release failed: {str(release_error)}")
+            raise
+
+    @retry(
+        retry=retry_if_exception_type(ClientError),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10)
+    )
+    async def upload_file(self, file_content: Union[bytes, BinaryIO], file_name: str,
+                          mime_type: str, application_id: uuid.UUID) -> Document:
+        """
+        Upload document to S3 with encryption and comprehensive validation.
+        File objects are validated and uploaded from the same handle without
+        being read into memory as a whole. Content is stored under DEDUPE_PREFIX
+        keyed by its hash; if identical content is already stored, only a new
+        document record is created and validation is limited to the MIME type.
+        Each document holds a reference on the stored object until it is deleted.
+        
+        Args:
+            file_content: Raw file content, or a seekable file object
+            file_name: Original file name
+            mime_type: File MIME type
+            application_id: Associated application ID
+            
+        Returns:
+            Document: Created document model instance
+            
+        Raises:
+            ValueError: For validation failures
+            ClientError: For S3 operation failures
+        """
+        try:
+            if isinstance(file_content, bytes):
+                file_content = io.BytesIO(file_content)
+            
+            # Hash first so duplicate content skips validation and the upload
+            file_hash = await asyncio.to_thread(generate_file_hash, file_content)
+            storage_path = self.content_storage_path(file_hash)
+            
+            document_id = uuid7()
+            existing = await self.reserve_content(storage_path, document_id, mime_type)
+            try:
+                document = await self._store_content(
+                    file_content, file_name, mime_type, application_id,
+                    document_id, file_hash, storage_path, existing
+                )
+            except Exception:
+                try:
+                    await self.release_reference(storage_path, document_id)
+                except Exception as release_error:
+                    logger.error(f"Reference release failed: {str(release_error)}")
+                raise
             
             logger.info(f"Document uploaded successfully: {storage_path}")
             return document
@@ -131,16 +475,93 @@ class StorageService:
             logger.error(f"Upload failed: {str(e)}")
             raise
 
+    async def _store_content(self, file_content: BinaryIO, file_name: str, mime_type: str,
+                             application_id: uuid.UUID, document_id: uuid.UUID,
+                             file_hash: str, storage_path: str,
+                             existing: Optional[Dict[str, Any]]) -> Document:
+        """Upload content unless already stored under storage_path, then record the document."""
+        if existing is not None:
+            file_name = sanitize_filename(file_name)
+            file_size = existing['ContentLength']
+            logger.info(f"Reusing stored content: {storage_path}")
+        else:
+            # Validate file content off the event loop
+            is_valid, error_msg, metadata = await asyncio.to_thread(
+                validate_file, file_content, mime_type, file_name, file_hash
+            )
+            if not is_valid:
+                raise ValueError(f"File validation failed: {error_msg}")
+            file_name = metadata['sanitized_filename']
+            file_size = metadata['file_size_bytes']
+            
+            # Upload to S3 with server-side encryption
+            client = await self._client()
+            object_args = {
+                'ContentType': mime_type,
+                'ServerSideEncryption': self._encryption_algorithm,
+                'Metadata': {
+                    'file_hash': file_hash
+                }
+            }
+            if file_size < TRANSFER_CONFIG.multipart_threshold:
+                await client.put_object(
+                    Bucket=self._bucket_name,
+                    Key=storage_path,
+                    Body=file_content.read(),
+                    ChecksumAlgorithm='SHA256',
+                    **object_args
+                )
+            else:
+                # Large files go up as concurrent multipart parts
+                await client.upload_fileobj(
+                    Fileobj=file_content,
+                    Bucket=self._bucket_name,
+                    Key=storage_path,
+                    ExtraArgs=object_args,
+                    Config=TRANSFER_CONFIG
+                )
+        
+        # Create document record
+        return await self.create_document(
+            document_id,
+            application_id,
+            file_name,
+            mime_type,
+            storage_path,
+            file_size
+        )
+
+    async def _head_object(self, client: Any, storage_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch object metadata, or None if the object does not exist.
+        
+        Args:
+            client: Open S3 client
+            storage_path: S3 storage path
+            
+        Returns:
+            Optional[Dict[str, Any]]: head_object response
+        """
+        try:
+            return await client.head_object(Bucket=self._bucket_name, Key=storage_path)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
     @retry(
+        retry=retry_if_exception_type(ClientError),
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10)
     )
-    def download_file(self, storage_path: str) -> Tuple[bytes, str]:
+    async def download_file(self, storage_path: str,
+                            verify_integrity: bool = False) -> Tuple[bytes, str]:
         """
         Download document from S3 with access verification.
         
         Args:
             storage_path: S3 storage path
+            verify_integrity: Verify the content against its stored checksum
             
         Returns:
             Tuple[bytes, str]: File content and MIME type
@@ -151,24 +572,35 @@ class StorageService:
         """
         try:
             # Verify storage path
-            if not storage_path.startswith("documents/") or ".." in storage_path:
-                raise ValueError("Invalid storage path")
+            assert_safe_storage_path(storage_path)
+            
+            client = await self._client()
+            if verify_integrity:
+                return await self._download_verified(client, storage_path)
             
-            # Download from S3
-            response = self._s3_client.get_object(
+            # Download the first part; small objects complete in this one request
+            chunk_size = TRANSFER_CONFIG.multipart_chunksize
+            response = await client.get_object(
                 Bucket=self._bucket_name,
-                Key=storage_path
+                Key=storage_path,
+                Range=f"bytes=0-{chunk_size - 1}"
             )
-            
-            content = response['Body'].read()
+            async with response['Body'] as body:
+                content = await body.read()
             mime_type = response['ContentType']
             
-            # Verify file integrity
-            stored_hash = response['Metadata'].get('file_hash')
-            if stored_hash:
-                current_hash = generate_file_hash(content)
-                if stored_hash != current_hash:
-                    raise ValueError("File integrity check failed")
+            # Fetch the remaining parts concurrently into a preallocated buffer
+            total_size = int(response['ContentRange'].rsplit('/', 1)[1])
+            if total_size > len(content):
+                buffer = bytearray(total_size)
+                buffer[:len(content)] = content
+                semaphore = asyncio.Semaphore(TRANSFER_CONFIG.max_concurrency)
+                await asyncio.gather(*(
+                    self._read_range(client, storage_path, start,
+                                     min(start + chunk_size, total_size), buffer, semaphore)
+                    for start in range(len(content), total_size, chunk_size)
+                ))
+                content = bytes(buffer)
             
             logger.info(f"Document downloaded successfully: {storage_path}")
             return content, mime_type
@@ -177,16 +609,146 @@ class StorageService:
             logger.error(f"Download failed: {str(e)}")
             raise
 
+    async def _download_verified(self, client: Any, storage_path: str) -> Tuple[bytes, str]:
+        """
+        Download a whole object and verify its integrity.
+        
+        Args:
+            client: Open S3 client
+            storage_path: S3 storage path
+            
+        Returns:
+            Tuple[bytes, str]: File content and MIME type
+            
+        Raises:
+            ValueError: If the content does not match the stored hash
+        """
+        response = await client.get_object(
+            Bucket=self._bucket_name,
+            Key=storage_path,
+            ChecksumMode='ENABLED'
+        )
+        content = b''.join([chunk async for chunk in self._iter_verified(response)])
+        
+        logger.info(f"Document downloaded and verified: {storage_path}")
+        return content, response['ContentType']
+
+    async def stream_file(self, storage_path: str, verify_integrity: bool = False,
+                          chunk_size: int = HASH_READ_SIZE) -> AsyncIterator[bytes]:
+        """
+        Stream a document from S3 in chunks as they arrive, without holding the
+        whole object in memory.
+        
+        Args:
+            storage_path: S3 storage path
+            verify_integrity: Verify the content against its stored checksum; a
+                mismatch is raised after the last chunk
+            chunk_size: Maximum chunk size in bytes
+            
+        Yields:
+            bytes: Next chunk of file content
+            
+        Raises:
+            ValueError: For invalid paths or failed integrity checks
+            ClientError: For S3 operation failures
+        """
+        assert_safe_storage_path(storage_path)
+        
+        client = await self._client()
+        response = await client.get_object(
+            Bucket=self._bucket_name,
+            Key=storage_path,
+            **({'ChecksumMode': 'ENABLED'} if verify_integrity else {})
+        )
+        chunks = (
+            self._iter_verified(response, chunk_size) if verify_integrity
+            else self._iter_body(response, chunk_size)
+        )
+        async for chunk in chunks:
+            yield chunk
+
+    @staticmethod
+    async def _iter_body(response: Dict[str, Any],
+                         chunk_size: int = HASH_READ_SIZE) -> AsyncIterator[bytes]:
+        """Yield the body of a get_object response chunk by chunk."""
+        async with response['Body'] as body:
+            async for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+
+    async def _iter_verified(self, response: Dict[str, Any],
+                             chunk_size: int = HASH_READ_SIZE) -> AsyncIterator[bytes]:
+        """
+        Yield the body of a get_object response requested with ChecksumMode enabled.
+        Objects with a full-object S3 SHA-256 checksum are verified by the SDK as
+        the body is read; all others, including multipart uploads whose composite
+        checksum the SDK skips, are hashed chunk-wise against their file_hash
+        metadata.
+        
+        Raises:
+            ValueError: If the content does not match the stored hash, or the
+                object carries no checksum that can verify it
+        """
+        # Composite checksums look like "<digest>-<part count>"
+        checksum = response.get('ChecksumSHA256')
+        sdk_verified = (checksum is not None and '-' not in checksum
+                        and response.get('ChecksumType', 'FULL_OBJECT') == 'FULL_OBJECT')
+        
+        stored_hash = response['Metadata'].get('file_hash')
+        hasher = None
+        if not sdk_verified:
+            if not stored_hash:
+                raise ValueError("File integrity cannot be verified")
+            hasher = hashlib.sha256()
+        
+        async for chunk in self._iter_body(response, chunk_size):
+            if hasher is not None:
+                hasher.update(chunk)
+            yield chunk
+        
+        if hasher is not None and hasher.hexdigest() != stored_hash:
+            raise ValueError("File integrity check failed")
+
+    async def _read_range(self, client: Any, storage_path: str, start: int, end: int,
+                          buffer: bytearray, semaphore: asyncio.Semaphore) -> None:
+        """Download bytes [start, end) of an object into buffer."""
+        async with semaphore:
+            response = await client.get_object(
+                Bucket=self._bucket_name,
+                Key=storage_path,
+                Range=f"bytes={start}-{end - 1}"
+            )
+            async with response['Body'] as body:
+                buffer[start:end] = await body.read()
+
+    async def download_many(self, storage_paths: List[str]) -> List[Tuple[bytes, str]]:
+        """
+        Download several documents concurrently.
+        
+        Args:
+            storage_paths: S3 storage paths
+            
+        Returns:
+            List[Tuple[bytes, str]]: File content and MIME type per path, in input order
+        """
+        return await asyncio.gather(*(self.download_file(path) for path in storage_paths))
+
     @retry(
+        retry=retry_if_exception_type(ClientError),
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10)
     )
-    def delete_file(self, storage_path: str) -> bool:
+    async def delete_file(self, storage_path: str,
+                          document_id: Optional[uuid.UUID] = None) -> bool:
         """
         Delete document from S3 with cascading updates.
+        Content-addressed objects are only removed when the last document
+        referencing them is deleted.
         
         Args:
             storage_path: S3 storage path
+            document_id: Document ID, when known; the status update then targets
+                the primary key instead of the storage_path index. Required for
+                content-addressed objects.
             
         Returns:
             bool: True if deletion successful
@@ -197,21 +759,33 @@ class StorageService:
         """
         try:
             # Verify storage path
-            if not storage_path.startswith("documents/") or ".." in storage_path:
-                raise ValueError("Invalid storage path")
+            assert_safe_storage_path(storage_path)
+            shared = storage_path.startswith(DEDUPE_PREFIX)
+            if shared and document_id is None:
+                raise ValueError("Document ID required to delete shared content")
+            
+            # Update document status in place as part of the next bulk write
+            selector = (
+                {'_id': str(document_id)} if document_id is not None
+                else {'storage_path': storage_path}
+            )
+            await self._bulk_writer.add(UpdateOne(
+                selector,
+                {'$set': {'status': DocumentStatus.DELETED.value}}
+            ))
+            
+            if shared:
+                if not await self.release_reference(storage_path, document_id):
+                    logger.info(f"Document deleted, content still referenced: {storage_path}")
+                return True
             
             # Delete from S3
-            self._s3_client.delete_object(
+            client = await self._client()
+            await client.delete_object(
                 Bucket=self._bucket_name,
                 Key=storage_path
             )
             
-            # Update document status
-            document = Document.objects(storage_path=storage_path).first()
-            if document:
-                document.status = DocumentStatus.DELETED
-                document.save()
-            
             logger.info(f"Document deleted successfully: {storage_path}")
             return True
             
@@ -219,7 +793,41 @@ class StorageService:
             logger.error(f"Deletion failed: {str(e)}")
             raise
 
-    def generate_presigned_url(self, storage_path: str, expiry_seconds: int = 3600) -> str:
+    async def release_reference(self, storage_path: str, document_id: uuid.UUID) -> bool:
+        """
+        Drop a document's reference on a shared object, deleting the object
+        along with the last reference.
+        
+        Args:
+            storage_path: S3 storage path of the shared object
+            document_id: Document ID holding the reference
+            
+        Returns:
+            bool: True if the object was deleted
+            
+        Raises:
+            ClientError: For S3 operation failures
+        """
+        deleting_at = await self._references.release(storage_path, str(document_id))
+        if deleting_at is None:
+            return False
+        
+        try:
+            client = await self._client()
+            await client.delete_object(
+                Bucket=self._bucket_name,
+                Key=storage_path
+            )
+        except Exception:
+            # Lift the tombstone so uploads of the same content are not blocked
+            await self._references.abandon_delete(storage_path, deleting_at)
+            raise
+        
+        await self._references.finish_delete(storage_path, deleting_at)
+        logger.info(f"Shared content deleted: {storage_path}")
+        return True
+
+    async def generate_presigned_url(self, storage_path: str, expiry_seconds: int = 3600) -> str:
         """
         Generate secure pre-signed URL for temporary access.
         
@@ -230,32 +838,78 @@ class StorageService:
         Returns:
             str: Pre-signed URL
             
+        Raises:
+            ValueError: For invalid parameters
+            ClientError: For S3 operation failures
+        """
+        url, _ = await self.generate_presigned_url_with_expiry(storage_path, expiry_seconds)
+        return url
+
+    async def generate_presigned_url_with_expiry(self, storage_path: str,
+                                                 expiry_seconds: int = 3600) -> Tuple[str, int]:
+        """
+        Generate secure pre-signed URL along with the seconds it remains valid.
+        URLs are reused until PRESIGNED_URL_CACHE_MARGIN_SECONDS before they expire,
+        and concurrent requests for the same uncached URL share one signing call,
+        so a returned URL may have less than expiry_seconds left.
+        
+        Args:
+            storage_path: S3 storage path
+            expiry_seconds: URL expiration time in seconds
+            
+        Returns:
+            Tuple[str, int]: Pre-signed URL and its remaining lifetime in seconds
+            
         Raises:
             ValueError: For invalid parameters
             ClientError: For S3 operation failures
         """
         try:
             # Validate parameters
-            if not storage_path.startswith("documents/") or ".." in storage_path:
-                raise ValueError("Invalid storage path")
+            assert_safe_storage_path(storage_path)
             
             if not 300 <= expiry_seconds <= 7200:  # 5 minutes to 2 hours
                 raise ValueError("Invalid expiry duration")
             
-            # Generate URL
-            url = self._s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': self._bucket_name,
-                    'Key': storage_path
-                },
-                ExpiresIn=expiry_seconds,
-                HttpMethod='GET'
-            )
+            cache_key = (storage_path, expiry_seconds)
+            cached = self._presigned_url_cache.get(cache_key)
+            if cached is None:
+                pending = self._presigned_url_pending.get(cache_key)
+                if pending is None:
+                    pending = asyncio.ensure_future(
+                        self._sign_url(cache_key, storage_path, expiry_seconds)
+                    )
+                    self._presigned_url_pending[cache_key] = pending
+                    pending.add_done_callback(
+                        lambda _: self._presigned_url_pending.pop(cache_key, None)
+                    )
+                
+                # Shielded so a cancelled caller does not cancel the other waiters
+                cached = await asyncio.shield(pending)
             
-            logger.info(f"Pre-signed URL generated for: {storage_path}")
-            return url
+            url, expires_at = cached
+            return url, int(expires_at - time.monotonic())
             
         except Exception as e:
             logger.error(f"URL generation failed: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    async def _sign_url(self, cache_key: Tuple[str, int], storage_path: str,
+                        expiry_seconds: int) -> Tuple[str, float]:
+        """Sign a GET URL for storage_path and cache it with its expiry time under cache_key."""
+        client = await self._client()
+        # Taken before signing so the recorded expiry never outlives the URL
+        expires_at = time.monotonic() + expiry_seconds
+        url = await client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self._bucket_name,
+                'Key': storage_path
+            },
+            ExpiresIn=expiry_seconds,
+            HttpMethod='GET'
+        )
+        
+        self._presigned_url_cache[cache_key] = (url, expires_at)
+        logger.info(f"Pre-signed URL generated for: {storage_path}")
+        return url, expires_at
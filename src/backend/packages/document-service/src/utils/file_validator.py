@@ -7,14 +7,19 @@ Version: 1.0.0
 
 import magic  # version: 0.4.27
 import hashlib
+import io
 import logging
 import os
-from typing import Tuple, Dict, Optional
+import queue
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Tuple, Dict, Optional, Union
 import clamd  # version: 1.0.2
-from tenacity import retry, stop_after_attempt, wait_exponential  # version: 8.0.1
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential  # version: 8.0.1
 import time
 
-from config import service_config
+from config import SERVICE_CONFIG, storage_config
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -25,26 +30,87 @@ RETRY_CONFIG = {
     "wait_exponential_multiplier": 1000
 }
 
+# Bytes inspected for MIME detection, and read size used when hashing file objects
+MIME_SNIFF_BYTES = 8192
+HASH_READ_SIZE = 1 << 20
+
+# Characters stripped from uploaded filenames ('..' is removed separately)
+_STRIP_TABLE = str.maketrans('', '', '/\\;&|*?<>^$')
+
+# Leading bytes identifying each allowed MIME type; libmagic is only consulted
+# for unrecognized content, container formats, or when strict detection is enabled
+_MAGIC_PREFIXES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'PK\x03\x04', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    (b'\xd0\xcf\x11\xe0', 'application/msword')
+)
+
+# ZIP and OLE2 prefixes are shared with jar, apk, xls, msi and other containers,
+# so a prefix match on these is always confirmed by libmagic
+_CONTAINER_MIME_TYPES = frozenset((
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/msword'
+))
+
+# Shared libmagic handle; loading the magic database is far costlier than a lookup
+_MIME_DETECTOR = magic.Magic(mime=True)
+
+# Pooled clamd clients; the pool size also caps concurrent scans per process.
+# Scans run on the caller's thread, which for uploads is the validator pool
+CLAMD_POOL_SIZE = 16
+CLAMD_POOL_TIMEOUT_SECONDS = 30
+_CLAMD_POOL: "queue.LifoQueue[clamd.ClamdUnixSocket]" = queue.LifoQueue(maxsize=CLAMD_POOL_SIZE)
+_clamd_created = 0
+_clamd_created_lock = threading.Lock()
+
+# Allowed MIME types, lower-cased once for O(1) membership checks
+ALLOWED_MIME_TYPES = frozenset(m.lower() for m in SERVICE_CONFIG.allowed_mime_types)
+
 class ValidationError(Exception):
     """Custom exception for validation errors"""
     pass
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1))
-def validate_mime_type(file_content: bytes, claimed_mime_type: str) -> Tuple[bool, str]:
+def sniff_mime(header: bytes) -> Optional[str]:
+    """
+    Identifies an allowed MIME type from its leading magic bytes.
+    Matches in _CONTAINER_MIME_TYPES only identify the container format.
+    
+    Args:
+        header: Leading bytes of the file
+    
+    Returns:
+        Detected MIME type, or None if no allowed type matches
+    """
+    for prefix, mime_type in _MAGIC_PREFIXES:
+        if header.startswith(prefix):
+            return mime_type
+    return None
+
+def validate_mime_type(file_content: bytes, claimed_mime_type: str,
+                       strict: Optional[bool] = None) -> Tuple[bool, str]:
     """
     Validates file MIME type against claimed type and allowed types list.
     
     Args:
         file_content: Raw file content in bytes
         claimed_mime_type: MIME type claimed by the upload request
+        strict: Also require libmagic to agree with the magic-byte match;
+            defaults to SERVICE_CONFIG.strict_mime_detection
     
     Returns:
         Tuple of (validation_result, error_message)
     """
     try:
-        # Initialize magic MIME type detector
-        mime = magic.Magic(mime=True)
-        detected_mime_type = mime.from_buffer(file_content)
+        if strict is None:
+            strict = SERVICE_CONFIG.strict_mime_detection
+        
+        # Detect MIME type from the magic bytes, falling back to libmagic so
+        # rejections still name the detected type
+        detected_mime_type = sniff_mime(file_content)
+        if detected_mime_type is None or strict or detected_mime_type in _CONTAINER_MIME_TYPES:
+            detected_mime_type = _MIME_DETECTOR.from_buffer(file_content[:MIME_SNIFF_BYTES])
         
         # Validate detected MIME type against claimed type
         if detected_mime_type.lower() != claimed_mime_type.lower():
@@ -53,8 +119,8 @@ def validate_mime_type(file_content: bytes, claimed_mime_type: str) -> Tuple[boo
             return False, error_msg
             
         # Check if MIME type is allowed
-        if detected_mime_type.lower() not in [m.lower() for m in service_config['allowed_mime_types']]:
-            error_msg = f"MIME type {detected_mime_type} not allowed"
+        if detected_mime_type.lower() not in ALLOWED_MIME_TYPES:
+            error_msg = f"MIME type not allowed: {detected_mime_type}"
             logger.warning(error_msg)
             return False, error_msg
             
@@ -78,7 +144,7 @@ def validate_file_size(file_size_bytes: int) -> Tuple[bool, str]:
     """
     # Convert bytes to MB for comparison
     file_size_mb = file_size_bytes / (1024 * 1024)
-    max_size_mb = service_config['max_file_size_mb']
+    max_size_mb = storage_config['max_file_size_mb']
     
     if file_size_mb > max_size_mb:
         error_msg = f"File size {file_size_mb:.2f}MB exceeds maximum allowed size of {max_size_mb}MB"
@@ -88,45 +154,98 @@ def validate_file_size(file_size_bytes: int) -> Tuple[bool, str]:
     logger.info(f"File size validation successful: {file_size_mb:.2f}MB")
     return True, ""
 
-def generate_file_hash(file_content: bytes) -> str:
+def generate_file_hash(file_content: Union[bytes, BinaryIO]) -> str:
     """
     Generates SHA-256 hash of file content for integrity verification.
+    File objects are hashed in HASH_READ_SIZE chunks and rewound afterwards.
     
     Args:
-        file_content: Raw file content in bytes
+        file_content: Raw file content in bytes, or a seekable file object
     
     Returns:
         Hexadecimal hash string
     """
     hasher = hashlib.sha256()
-    hasher.update(file_content)
+    if isinstance(file_content, bytes):
+        hasher.update(file_content)
+    else:
+        while chunk := file_content.read(HASH_READ_SIZE):
+            hasher.update(chunk)
+        file_content.seek(0)
     file_hash = hasher.hexdigest()
     logger.debug(f"Generated file hash: {file_hash}")
     return file_hash
 
-def scan_for_viruses(file_content: bytes) -> Tuple[bool, str]:
+@contextmanager
+def _clamd_client() -> Iterator[clamd.ClamdUnixSocket]:
+    """
+    Borrow a clamd client, creating up to CLAMD_POOL_SIZE on demand.
+    
+    Raises:
+        ValidationError: If no client is returned within CLAMD_POOL_TIMEOUT_SECONDS
+    """
+    global _clamd_created
+    try:
+        client = _CLAMD_POOL.get_nowait()
+    except queue.Empty:
+        with _clamd_created_lock:
+            create = _clamd_created < CLAMD_POOL_SIZE
+            if create:
+                _clamd_created += 1
+        if create:
+            try:
+                client = clamd.ClamdUnixSocket()
+            except Exception:
+                # Give the slot back so a failed construction does not shrink the pool
+                with _clamd_created_lock:
+                    _clamd_created -= 1
+                raise
+        else:
+            # Pool exhausted: wait for a client to be returned
+            try:
+                client = _CLAMD_POOL.get(timeout=CLAMD_POOL_TIMEOUT_SECONDS)
+            except queue.Empty:
+                raise ValidationError("Timed out waiting for a clamd connection")
+    try:
+        yield client
+    finally:
+        _CLAMD_POOL.put(client)
+
+@retry(
+    retry=retry_if_exception_type(clamd.ConnectionError),
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1),
+    reraise=True
+)
+def _clamd_instream(file_content: BinaryIO) -> Dict:
+    """Stream content to clamd, retrying on daemon connection failures."""
+    file_content.seek(0)
+    with _clamd_client() as client:
+        return client.instream(file_content)
+
+def scan_for_viruses(file_content: Union[bytes, BinaryIO]) -> Tuple[bool, str]:
     """
     Scans file content for viruses using ClamAV.
     
     Args:
-        file_content: Raw file content in bytes
+        file_content: Raw file content in bytes, or a readable file object
     
     Returns:
         Tuple of (scan_result, error_message)
     """
     try:
-        # Initialize ClamAV client
-        cd = clamd.ClamdUnixSocket()
-        
-        # Scan file content
-        scan_result = cd.instream(file_content)
-        scan_status = list(scan_result.values())[0]
+        # Scan file content (clamd streams from a file-like object)
+        if isinstance(file_content, bytes):
+            file_content = io.BytesIO(file_content)
+        scan_result = _clamd_instream(file_content)
+        file_content.seek(0)
+        status, detail = next(iter(scan_result.values()))
         
-        if scan_status[0] == 'OK':
+        if status == 'OK':
             logger.info("Virus scan passed")
             return True, ""
         else:
-            error_msg = f"Virus detected: {scan_status[1]}"
+            error_msg = f"Virus detected: {detail}"
             logger.warning(error_msg)
             return False, error_msg
             
@@ -148,30 +267,34 @@ def sanitize_filename(filename: str) -> str:
     # Remove path components and keep only filename
     filename = os.path.basename(filename)
     
-    # Remove potentially dangerous characters
-    forbidden_chars = ['/', '\\', '..', ';', '&', '|', '*', '?', '<', '>', '^', '$']
-    for char in forbidden_chars:
-        filename = filename.replace(char, '')
-        
-    return filename
+    # Remove potentially dangerous characters in a single pass, then traversal sequences
+    return filename.translate(_STRIP_TABLE).replace('..', '')
 
-def validate_file(file_content: bytes, mime_type: str, file_name: str) -> Tuple[bool, str, Dict]:
+def validate_file(file_content: Union[bytes, BinaryIO], mime_type: str,
+                  file_name: str, file_hash: Optional[str] = None) -> Tuple[bool, str, Dict]:
     """
     Performs comprehensive file validation including security checks.
+    A file object is read in place: only its first MIME_SNIFF_BYTES for the
+    MIME check, then streamed for hashing and virus scanning, and left rewound.
     
     Args:
-        file_content: Raw file content in bytes
+        file_content: Raw file content in bytes, or a seekable file object
         mime_type: Claimed MIME type of the file
         file_name: Original filename
+        file_hash: SHA-256 digest of the content, if already computed
     
     Returns:
         Tuple of (validation_result, error_message, metadata)
     """
     start_time = time.time()
+    if isinstance(file_content, bytes):
+        file_content = io.BytesIO(file_content)
+    file_size = file_content.seek(0, os.SEEK_END)
+    file_content.seek(0)
     metadata = {
         'original_filename': file_name,
         'sanitized_filename': '',
-        'file_size_bytes': len(file_content),
+        'file_size_bytes': file_size,
         'mime_type': mime_type,
         'file_hash': '',
         'validation_time_ms': 0
@@ -179,33 +302,35 @@ def validate_file(file_content: bytes, mime_type: str, file_name: str) -> Tuple[
     
     try:
         # Check for empty file
-        if not file_content:
+        if not file_size:
             return False, "Empty file content", metadata
             
         # Sanitize filename
         metadata['sanitized_filename'] = sanitize_filename(file_name)
         
-        # Validate MIME type
-        mime_valid, mime_error = validate_mime_type(file_content, mime_type)
+        # Validate MIME type from the file header
+        header = file_content.read(MIME_SNIFF_BYTES)
+        file_content.seek(0)
+        mime_valid, mime_error = validate_mime_type(header, mime_type)
         if not mime_valid:
             return False, mime_error, metadata
             
         # Validate file size
-        size_valid, size_error = validate_file_size(len(file_content))
+        size_valid, size_error = validate_file_size(file_size)
         if not size_valid:
             return False, size_error, metadata
             
         # Generate file hash
-        metadata['file_hash'] = generate_file_hash(file_content)
+        metadata['file_hash'] = file_hash or generate_file_hash(file_content)
         
         # Perform virus scan if enabled
-        if service_config.get('virus_scan_enabled', True):
+        if SERVICE_CONFIG.virus_scan_enabled:
             virus_free, virus_error = scan_for_viruses(file_content)
             if not virus_free:
                 return False, virus_error, metadata
                 
         # Apply content validation rules
-        rules = service_config['content_validation_rules']
+        rules = SERVICE_CONFIG.content_validation_rules
         # Additional content validation could be implemented here based on rules
         
         # Calculate validation time
@@ -220,5 +345,108 @@ def validate_file(file_content: bytes, mime_type: str, file_name: str) -> Tuple[
         metadata['validation_time_ms'] = int((time.time() - start_time) * 1000)
         return False, error_msg, metadata
 
+class StreamingValidator:
+    """
+    Incremental counterpart to validate_file for uploads consumed in chunks.
+    Sniffs the MIME type on the first chunk, enforces the size limit and hashes
+    as data arrives, and spools content to disk only when a virus scan is required.
+    """
+
+    def __init__(self, mime_type: str, file_name: str, spool_size: int,
+                 virus_scan: bool = True):
+        """
+        Initialize validator state for a single upload.
+        
+        Args:
+            mime_type: Claimed MIME type of the file
+            file_name: Original filename
+            spool_size: Bytes kept in memory before the scan spool rolls over to disk
+            virus_scan: Whether the content needs scanning, if scanning is enabled
+        """
+        self._start_time = time.time()
+        self._mime_type = mime_type
+        self._max_size_bytes = storage_config['max_file_size_mb'] * 1024 * 1024
+        self._hasher = hashlib.sha256()
+        self._size = 0
+        self._spool = (
+            tempfile.SpooledTemporaryFile(max_size=spool_size)
+            if virus_scan and SERVICE_CONFIG.virus_scan_enabled else None
+        )
+        self.metadata = {
+            'original_filename': file_name,
+            'sanitized_filename': sanitize_filename(file_name),
+            'file_size_bytes': 0,
+            'mime_type': mime_type,
+            'file_hash': '',
+            'validation_time_ms': 0
+        }
+
+    def update(self, chunk: bytes) -> Tuple[bool, str]:
+        """
+        Validates and hashes the next chunk of file content.
+        
+        Args:
+            chunk: Next chunk of raw file content
+        
+        Returns:
+            Tuple of (validation_result, error_message)
+        """
+        # Sniff MIME type from the leading bytes only
+        if self._size == 0:
+            mime_valid, mime_error = validate_mime_type(chunk, self._mime_type)
+            if not mime_valid:
+                return False, mime_error
+        
+        # Reject as soon as the running size crosses the limit
+        self._size += len(chunk)
+        if self._size > self._max_size_bytes:
+            return validate_file_size(self._size)
+        
+        self._hasher.update(chunk)
+        if self._spool is not None:
+            self._spool.write(chunk)
+        return True, ""
+
+    def finalize(self) -> Tuple[bool, str, Dict]:
+        """
+        Completes validation once all chunks have been consumed.
+        
+        Returns:
+            Tuple of (validation_result, error_message, metadata)
+        """
+        metadata = self.metadata
+        metadata['file_size_bytes'] = self._size
+        
+        try:
+            # Check for empty file
+            if self._size == 0:
+                return False, "Empty file content", metadata
+            
+            metadata['file_hash'] = self._hasher.hexdigest()
+            
+            # Perform virus scan over the spooled content
+            if self._spool is not None:
+                self._spool.seek(0)
+                virus_free, virus_error = scan_for_viruses(self._spool)
+                if not virus_free:
+                    return False, virus_error, metadata
+            
+            logger.info(f"File validation successful: {metadata['sanitized_filename']}")
+            return True, "", metadata
+        finally:
+            metadata['validation_time_ms'] = int((time.time() - self._start_time) * 1000)
+
+    def close(self) -> None:
+        """Releases the scan spool, if any."""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
 # Export public functions
-__all__ = ['validate_file', 'generate_file_hash']
\ No newline at end of file
+__all__ = [
+    'validate_file',
+    'sniff_mime',
+    'generate_file_hash',
+    'StreamingValidator',
+    'ALLOWED_MIME_TYPES'
+]
\ No newline at end of file
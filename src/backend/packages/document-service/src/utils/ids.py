@@ -0,0 +1,32 @@
+"""
+Identifier generation utilities for the Document Service.
+Provides time-ordered UUIDs so new documents land at the right edge of the _id index.
+
+Version: 1.0.0
+"""
+
+import os
+import time
+import uuid
+
+def _uuid7() -> uuid.UUID:
+    """
+    Generate an RFC 9562 version 7 UUID.
+
+    The leading 48 bits hold the Unix timestamp in milliseconds and the
+    remaining 74 bits are random, so IDs sort by creation time.
+
+    Returns:
+        uuid.UUID: Time-ordered UUID
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    # Set version (0111) and RFC 4122 variant (10) bits
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=value)
+
+# Prefer the standard library implementation (Python 3.14+)
+uuid7 = getattr(uuid, "uuid7", _uuid7)
+
+__all__ = ['uuid7']
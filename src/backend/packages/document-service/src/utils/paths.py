@@ -0,0 +1,45 @@
+"""
+Storage path policy for the Document Service.
+Defines in one place which S3 keys the service may read, write or delete.
+
+Version: 1.0.0
+"""
+
+import re
+from functools import lru_cache
+
+# Every stored object lives under this prefix
+STORAGE_PATH_PREFIX = "documents/"
+
+# Traversal sequences and Windows separators, matched in a single scan
+_UNSAFE_PATH = re.compile(r'\.\.|\\')
+
+@lru_cache(maxsize=4096)
+def is_safe_storage_path(storage_path: str) -> bool:
+    """
+    Checks a storage path against the storage path policy.
+    Results are cached since the same paths are checked on every download.
+
+    Args:
+        storage_path: S3 storage path
+
+    Returns:
+        bool: True if the path is under STORAGE_PATH_PREFIX and free of traversal
+    """
+    return (storage_path.startswith(STORAGE_PATH_PREFIX)
+            and _UNSAFE_PATH.search(storage_path) is None)
+
+def assert_safe_storage_path(storage_path: str) -> None:
+    """
+    Rejects storage paths that violate the storage path policy.
+
+    Args:
+        storage_path: S3 storage path
+
+    Raises:
+        ValueError: If the path is unsafe
+    """
+    if not is_safe_storage_path(storage_path):
+        raise ValueError("Invalid storage path")
+
+__all__ = ['STORAGE_PATH_PREFIX', 'is_safe_storage_path', 'assert_safe_storage_path']
@@ -10,27 +10,68 @@ import pytest
 import uuid
 import os
 import json
+import io
+import mmap
+import zipfile
 from datetime import datetime, timezone
 from unittest.mock import Mock, patch
 from fastapi.testclient import TestClient
 from moto import mock_s3  # version: 4.1.11
 import mongomock  # version: 4.1.2
+import mongoengine
+from mongomock_motor import AsyncMongoMockClient  # version: 0.0.21
 import boto3
-from cryptography.fernet import Fernet  # version: 41.0.0
+from botocore.exceptions import ClientError
 import httpx  # version: 0.24.0
 
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
 from app import app
+from middleware.compression import CompressionMiddleware, select_encoding
 from models.document import Document, DocumentStatus, VerificationStatus
-from services.storage_service import StorageService
-from utils.file_validator import validate_file, generate_file_hash
+from services.storage_service import AsyncStorageService
+from services.storage_refs import REFERENCES_COLLECTION
+from utils.file_validator import validate_file, validate_mime_type, generate_file_hash, sniff_mime
+
+def _generate_encryption_key() -> bytes:
+    """Generate a throwaway Fernet key, loading cryptography only when needed."""
+    from cryptography.fernet import Fernet  # version: 41.0.0
+    return Fernet.generate_key()
 
 # Test constants
 TEST_APPLICATION_ID = uuid.uuid4()
-TEST_FILE_CONTENT = b'test file content'
+TEST_APPLICATION_ID_STR = str(TEST_APPLICATION_ID)
+TEST_FILE_CONTENT = b'%PDF-1.4 test file content'
+TEST_FILE_HASH = generate_file_hash(TEST_FILE_CONTENT)
 TEST_FILE_NAME = 'test_document.pdf'
 TEST_MIME_TYPE = 'application/pdf'
-TEST_ENCRYPTION_KEY = os.getenv('TEST_ENCRYPTION_KEY', Fernet.generate_key())
+TEST_ENCRYPTION_KEY = os.getenv('TEST_ENCRYPTION_KEY') or _generate_encryption_key()
 TEST_ACCESS_TOKEN = "test_jwt_token"
+TEST_REQUEST_ID = "test-request"
+
+# Expected response fields, checked as subsets of the response body
+EXPECTED_DOWNLOAD_FIELDS = {
+    'file_name': TEST_FILE_NAME,
+    'mime_type': TEST_MIME_TYPE
+}
+EXPECTED_DOCUMENT_FIELDS = {
+    **EXPECTED_DOWNLOAD_FIELDS,
+    'application_id': TEST_APPLICATION_ID_STR
+}
+EXPECTED_UPLOAD_FIELDS = {
+    **EXPECTED_DOCUMENT_FIELDS,
+    'status': DocumentStatus.UPLOADED.value,
+    'encryption_status': "AES-256-GCM"
+}
+
+# State-changing lifecycle requests as (method, path suffix, response key, expected
+# value); deletion goes last as it ends the lifecycle
+LIFECYCLE_UPDATES = (
+    ('PUT', '/verify', 'verification_status', VerificationStatus.VERIFIED.value),
+    ('DELETE', '', 'message', "Document deleted successfully")
+)
 
 @pytest.fixture(scope='module')
 def s3_client():
@@ -42,7 +83,8 @@ def s3_client():
             aws_access_key_id='test',
             aws_secret_access_key='test'
         )
-        # Create test bucket with encryption
+        # Create test bucket with encryption; the storage service reads the
+        # encryption configuration back and rejects unencrypted buckets
         s3.create_bucket(Bucket='test-bucket')
         s3.put_bucket_encryption(
             Bucket='test-bucket',
@@ -58,30 +100,98 @@ def s3_client():
         )
         yield s3
 
-@pytest.fixture(scope='module')
+@pytest.fixture(scope='session')
 def mongo_client():
-    """Configure mocked MongoDB client with security context."""
-    with mongomock.patch(servers=(('mongodb://localhost', 27017),)):
-        yield
+    """Connect MongoEngine directly to an in-memory mongomock client."""
+    mongoengine.disconnect_all()
+    mongoengine.connect(
+        host='mongodb://localhost',
+        mongo_client_class=mongomock.MongoClient,
+        alias='default'
+    )
+    yield
+    mongoengine.disconnect_all()
+
+@pytest.fixture(scope='session')
+def oversize_payload():
+    """101MB PDF-headed payload and a placeholder checksum, built once per session."""
+    # Anonymous mapping: untouched pages stay zero-filled and are never committed
+    payload = mmap.mmap(-1, 101 * 1024 * 1024)
+    payload.write(b'%PDF-')
+    # Rejected on size before the checksum is compared, so it is never hashed
+    yield payload, 'deadbeef' * 8
+    payload.close()
 
 @pytest.fixture(scope='module')
-def storage_service(s3_client):
-    """Initialize storage service with mocked S3."""
-    with patch('services.storage_service.boto3.client') as mock_boto3:
-        mock_boto3.return_value = s3_client
-        service = StorageService()
-        service._bucket_name = 'test-bucket'
-        yield service
+def valid_upload_data():
+    """Upload form fields matching TEST_FILE_CONTENT."""
+    return {
+        'application_id': TEST_APPLICATION_ID_STR,
+        'file_name': TEST_FILE_NAME,
+        'mime_type': TEST_MIME_TYPE,
+        'file_size': len(TEST_FILE_CONTENT),
+        'checksum': TEST_FILE_HASH
+    }
+
+@pytest.fixture(scope='module')
+def invalid_mime_upload_data():
+    """Upload form fields claiming a disallowed MIME type."""
+    return {
+        'application_id': TEST_APPLICATION_ID_STR,
+        'file_name': 'test.exe',
+        'mime_type': 'application/x-msdownload',
+        'file_size': 100,
+        'checksum': 'test_hash'
+    }
+
+@pytest.fixture(scope='module')
+def oversize_upload_data(valid_upload_data, oversize_payload):
+    """Upload form fields for the oversize payload."""
+    payload, checksum = oversize_payload
+    return {**valid_upload_data, 'file_size': len(payload), 'checksum': checksum}
+
+@pytest.fixture(scope='module')
+def make_doc():
+    """Factory for test documents; keyword arguments override the defaults."""
+    def _make_doc(**overrides):
+        fields = dict(
+            application_id=TEST_APPLICATION_ID,
+            file_name=TEST_FILE_NAME,
+            mime_type=TEST_MIME_TYPE,
+            storage_path=f"documents/{TEST_APPLICATION_ID}/test_document.pdf",
+            file_size=len(TEST_FILE_CONTENT),
+            status=DocumentStatus.PENDING,
+            verification_status=VerificationStatus.UNVERIFIED
+        )
+        fields.update(overrides)
+        return Document(id=uuid.uuid4(), **fields)
+    return _make_doc
 
 @pytest.fixture
+async def storage_service(s3_client):
+    """Initialize storage service with mocked S3."""
+    # The S3 client opens lazily, inside the moto mock started by s3_client, and
+    # is bound to the test's event loop, so each test gets its own service
+    service = AsyncStorageService()
+    service._bucket_name = 'test-bucket'
+    yield service
+    await service.close()
+
+@pytest.fixture(scope='session')
 def test_client(mongo_client):
     """Initialize FastAPI test client with security configuration."""
-    with TestClient(app) as client:
-        client.headers.update({
-            "Authorization": f"Bearer {TEST_ACCESS_TOKEN}",
-            "X-Request-ID": str(uuid.uuid4())
-        })
-        yield client
+    # Session-scoped: entering the client runs the app's startup and shutdown events.
+    # Startup must keep the mocked connection instead of opening its own
+    with patch('app.mongoengine.connect'), TestClient(app) as client:
+        # Route the controller's Motor reads to the same mocked MongoDB
+        motor_client = AsyncMongoMockClient(mock_mongo_client=mongoengine.get_connection())
+        documents_coll = motor_client[Document._get_db().name][Document._get_collection_name()]
+        with patch('controllers.document_controller.documents_coll', documents_coll):
+            client.headers.update({
+                "Authorization": f"Bearer {TEST_ACCESS_TOKEN}",
+                "X-Request-ID": TEST_REQUEST_ID
+            })
+            yield client
 
 class TestDocumentService:
     """
@@ -90,46 +200,27 @@ class TestDocumentService:
     """
 
     @pytest.fixture(autouse=True)
-    def setup_method(self, mongo_client, storage_service):
+    def setup_method(self, mongo_client):
         """Set up test environment before each test."""
-        # Clear test data
-        Document.objects.delete()
-        
-        # Initialize test document
-        self.test_doc = Document(
-            id=uuid.uuid4(),
-            application_id=TEST_APPLICATION_ID,
-            file_name=TEST_FILE_NAME,
-            mime_type=TEST_MIME_TYPE,
-            storage_path=f"documents/{TEST_APPLICATION_ID}/test_document.pdf",
-            file_size=len(TEST_FILE_CONTENT),
-            status=DocumentStatus.PENDING,
-            verification_status=VerificationStatus.UNVERIFIED
-        )
-        
-        # Configure mocked services
-        self.storage_service = storage_service
-
-    @pytest.mark.asyncio
-    async def test_upload_document(self, test_client, storage_service):
-        """Test secure document upload with encryption and validation."""
+        # Clear test data; dropping truncates the mocked collection in one step
+        Document._get_collection().drop()
+        Document._get_db()[REFERENCES_COLLECTION].drop()
+
+    def test_document_lifecycle(self, test_client, s3_client, valid_upload_data):
+        """
+        Test a document through upload, retrieval, download, verification and
+        deletion; each stage builds on the document uploaded in the first.
+        """
         # Prepare test file
         files = {
             'file': (TEST_FILE_NAME, TEST_FILE_CONTENT, TEST_MIME_TYPE)
         }
-        data = {
-            'application_id': str(TEST_APPLICATION_ID),
-            'file_name': TEST_FILE_NAME,
-            'mime_type': TEST_MIME_TYPE,
-            'file_size': len(TEST_FILE_CONTENT),
-            'checksum': generate_file_hash(TEST_FILE_CONTENT)
-        }
 
         # Test upload endpoint
         response = test_client.post(
             "/api/v1/documents/",
             files=files,
-            data=data
+            data=valid_upload_data
         )
 
         assert response.status_code == 200
@@ -137,11 +228,7 @@ class TestDocumentService:
 
         # Verify response structure
         assert 'id' in result
-        assert result['application_id'] == str(TEST_APPLICATION_ID)
-        assert result['file_name'] == TEST_FILE_NAME
-        assert result['mime_type'] == TEST_MIME_TYPE
-        assert result['status'] == DocumentStatus.UPLOADED.value
-        assert result['encryption_status'] == "AES-256-GCM"
+        assert EXPECTED_UPLOAD_FIELDS.items() <= result.items()
 
         # Verify document in MongoDB
         doc = Document.objects(id=uuid.UUID(result['id'])).first()
@@ -149,100 +236,129 @@ class TestDocumentService:
         assert doc.verification_status == VerificationStatus.UNVERIFIED
 
         # Verify file in S3
-        stored_file = storage_service.download_file(doc.storage_path)
-        assert stored_file[0] == TEST_FILE_CONTENT
-        assert stored_file[1] == TEST_MIME_TYPE
-
-    @pytest.mark.asyncio
-    async def test_get_document(self, test_client):
-        """Test secure document retrieval with access control."""
-        # Create test document
-        self.test_doc.save()
+        stored_file = s3_client.get_object(Bucket='test-bucket', Key=doc.storage_path)
+        assert stored_file['Body'].read() == TEST_FILE_CONTENT
+        assert stored_file['ContentType'] == TEST_MIME_TYPE
 
         # Test retrieval endpoint
-        response = test_client.get(f"/api/v1/documents/{self.test_doc.id}")
+        response = test_client.get(f"/api/v1/documents/{doc.id}")
 
         assert response.status_code == 200
         result = response.json()
-
-        # Verify response data
-        assert result['id'] == str(self.test_doc.id)
-        assert result['application_id'] == str(TEST_APPLICATION_ID)
-        assert result['file_name'] == TEST_FILE_NAME
-        assert result['mime_type'] == TEST_MIME_TYPE
+        assert {**EXPECTED_DOCUMENT_FIELDS, 'id': str(doc.id)}.items() <= result.items()
         assert 'encryption_status' in result
 
-    @pytest.mark.asyncio
-    async def test_download_document(self, test_client, storage_service):
-        """Test secure document download with encryption verification."""
-        # Upload test file to S3
-        storage_service.upload_file(
-            TEST_FILE_CONTENT,
-            TEST_FILE_NAME,
-            TEST_MIME_TYPE,
-            TEST_APPLICATION_ID
+        # Conditional request with the current ETag short-circuits to 304
+        etag = response.headers['etag']
+        response = test_client.get(
+            f"/api/v1/documents/{doc.id}",
+            headers={"If-None-Match": etag}
         )
-        self.test_doc.save()
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert response.content == b""
 
         # Test download endpoint
-        response = test_client.get(f"/api/v1/documents/{self.test_doc.id}/download")
+        response = test_client.get(f"/api/v1/documents/{doc.id}/download")
 
         assert response.status_code == 200
         result = response.json()
+        assert EXPECTED_DOWNLOAD_FIELDS.items() <= result.items()
+        assert {'download_url', 'expires_in'} <= result.keys()
 
-        # Verify download URL and metadata
-        assert 'download_url' in result
-        assert result['file_name'] == TEST_FILE_NAME
-        assert result['mime_type'] == TEST_MIME_TYPE
-        assert 'expires_in' in result
-
-    @pytest.mark.asyncio
-    async def test_delete_document(self, test_client, storage_service):
-        """Test secure document deletion with cascading updates."""
-        # Create test document
-        self.test_doc.save()
-
-        # Test deletion endpoint
-        response = test_client.delete(f"/api/v1/documents/{self.test_doc.id}")
+        # Test the verification and deletion endpoints
+        for method, path_suffix, expected_key, expected_value in LIFECYCLE_UPDATES:
+            response = test_client.request(method, f"/api/v1/documents/{doc.id}{path_suffix}")
 
-        assert response.status_code == 200
-        result = response.json()
+            assert response.status_code == 200
+            assert response.json()[expected_key] == expected_value
 
-        # Verify document deletion
-        assert result['message'] == "Document deleted successfully"
-        doc = Document.objects(id=self.test_doc.id).first()
+        doc.reload()
+        assert doc.verification_status == VerificationStatus.VERIFIED
         assert doc.status == DocumentStatus.DELETED
 
     @pytest.mark.asyncio
-    async def test_verify_document(self, test_client):
-        """Test document verification status updates."""
-        # Create test document
-        self.test_doc.save()
+    async def test_duplicate_upload_shares_storage(self, storage_service, s3_client):
+        """Test identical uploads share one stored object until both are deleted."""
+        first = await storage_service.upload_file(
+            TEST_FILE_CONTENT, TEST_FILE_NAME, TEST_MIME_TYPE, TEST_APPLICATION_ID
+        )
+        second = await storage_service.upload_file(
+            TEST_FILE_CONTENT, 'copy.pdf', TEST_MIME_TYPE, uuid.uuid4()
+        )
+
+        assert first.id != second.id
+        assert first.storage_path == second.storage_path
 
-        # Test verification endpoint
-        response = test_client.put(f"/api/v1/documents/{self.test_doc.id}/verify")
+        # The object survives while another document references it
+        await storage_service.delete_file(first.storage_path, first.id)
+        stored_file = await storage_service.download_file(second.storage_path)
+        assert stored_file[0] == TEST_FILE_CONTENT
 
+        # Deleting the last reference removes the object and its reference set
+        await storage_service.delete_file(second.storage_path, second.id)
+        with pytest.raises(ClientError):
+            s3_client.head_object(Bucket='test-bucket', Key=second.storage_path)
+        assert Document._get_db()[REFERENCES_COLLECTION].count_documents({}) == 0
+
+    def test_duplicate_api_upload_shares_storage(self, test_client, s3_client, valid_upload_data):
+        """Test identical uploads through the API share one stored object."""
+        files = {'file': (TEST_FILE_NAME, TEST_FILE_CONTENT, TEST_MIME_TYPE)}
+        first = test_client.post("/api/v1/documents/", files=files, data=valid_upload_data)
+        second = test_client.post("/api/v1/documents/", files=files, data=valid_upload_data)
+
+        assert first.status_code == second.status_code == 200
+        docs = [Document.objects(id=uuid.UUID(r.json()['id'])).first() for r in (first, second)]
+        assert docs[0].storage_path == docs[1].storage_path
+
+        # The object survives while another document references it
+        test_client.delete(f"/api/v1/documents/{docs[0].id}")
+        s3_client.head_object(Bucket='test-bucket', Key=docs[1].storage_path)
+
+        test_client.delete(f"/api/v1/documents/{docs[1].id}")
+        with pytest.raises(ClientError):
+            s3_client.head_object(Bucket='test-bucket', Key=docs[1].storage_path)
+
+    def test_get_document_etag(self, test_client, make_doc):
+        """Test that a request carrying the current ETag is answered with 304."""
+        doc = make_doc()
+        doc.save()
+        url = f"/api/v1/documents/{doc.id}"
+
+        response = test_client.get(url)
         assert response.status_code == 200
-        result = response.json()
+        etag = response.headers['etag']
 
-        # Verify status update
-        assert result['verification_status'] == VerificationStatus.VERIFIED.value
-        doc = Document.objects(id=self.test_doc.id).first()
-        assert doc.verification_status == VerificationStatus.VERIFIED
+        response = test_client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert not response.content
 
-    @pytest.mark.asyncio
-    async def test_invalid_mime_type(self, test_client):
+    def test_invalid_mime_type(self, test_client, invalid_mime_upload_data):
         """Test rejection of invalid MIME types."""
         files = {
             'file': ('test.exe', b'malicious content', 'application/x-msdownload')
         }
-        data = {
-            'application_id': str(TEST_APPLICATION_ID),
-            'file_name': 'test.exe',
-            'mime_type': 'application/x-msdownload',
-            'file_size': 100,
-            'checksum': 'test_hash'
+
+        response = test_client.post(
+            "/api/v1/documents/",
+            files=files,
+            data=invalid_mime_upload_data
+        )
+
+        assert response.status_code == 400
+        assert "MIME type not allowed" in response.json()['detail']
+
+    @pytest.mark.parametrize('checksum,detail', [
+        (generate_file_hash(b'other content'), 'checksum mismatch'),
+        ('test_hash', 'invalid checksum')
+    ])
+    def test_checksum_mismatch(self, test_client, valid_upload_data, checksum, detail):
+        """Test rejection of uploads whose checksum is malformed or does not match."""
+        files = {
+            'file': (TEST_FILE_NAME, TEST_FILE_CONTENT, TEST_MIME_TYPE)
         }
+        data = {**valid_upload_data, 'checksum': checksum}
 
         response = test_client.post(
             "/api/v1/documents/",
@@ -251,56 +367,100 @@ class TestDocumentService:
         )
 
         assert response.status_code == 400
-        assert "MIME type not allowed" in response.json()['detail']
+        assert detail in response.json()['detail']
+        assert Document.objects.count() == 0
 
-    @pytest.mark.asyncio
-    async def test_file_size_limit(self, test_client):
+    def test_file_size_limit(self, test_client, oversize_payload, oversize_upload_data):
         """Test enforcement of file size limits."""
-        large_content = b'x' * (101 * 1024 * 1024)  # 101MB
+        large_content, _ = oversize_payload
+        large_content.seek(0)
         files = {
             'file': (TEST_FILE_NAME, large_content, TEST_MIME_TYPE)
         }
-        data = {
-            'application_id': str(TEST_APPLICATION_ID),
-            'file_name': TEST_FILE_NAME,
-            'mime_type': TEST_MIME_TYPE,
-            'file_size': len(large_content),
-            'checksum': generate_file_hash(large_content)
-        }
 
         response = test_client.post(
             "/api/v1/documents/",
             files=files,
-            data=data
+            data=oversize_upload_data
         )
 
         assert response.status_code == 400
         assert "exceeds maximum allowed size" in response.json()['detail']
 
-    def test_document_validation(self):
+    def test_dumps_many(self, make_doc):
+        """Test batch JSON serialization of documents."""
+        doc = make_doc()
+        result = json.loads(Document.dumps_many([doc]))
+
+        assert {
+            'id': str(doc.id),
+            'application_id': TEST_APPLICATION_ID_STR,
+            'uploaded_at': doc.uploaded_at.isoformat(),
+            'status': DocumentStatus.PENDING.value
+        }.items() <= result[0].items()
+
+    @pytest.mark.parametrize('bad_field,bad_value', [
+        ('file_name', '../malicious.pdf'),
+        ('storage_path', '../../malicious/path.pdf'),
+        ('file_name', 'a' * 256 + '.pdf')
+    ])
+    def test_document_validation(self, make_doc, bad_field, bad_value):
         """Test document model validation rules."""
-        # Test invalid file name
-        with pytest.raises(Exception):
-            Document(
-                id=uuid.uuid4(),
-                application_id=TEST_APPLICATION_ID,
-                file_name="../malicious.pdf",
-                mime_type=TEST_MIME_TYPE,
-                storage_path="documents/test.pdf",
-                file_size=100,
-                status=DocumentStatus.PENDING,
-                verification_status=VerificationStatus.UNVERIFIED
-            ).validate()
-
-        # Test invalid storage path
-        with pytest.raises(Exception):
-            Document(
-                id=uuid.uuid4(),
-                application_id=TEST_APPLICATION_ID,
-                file_name="test.pdf",
-                mime_type=TEST_MIME_TYPE,
-                storage_path="../../malicious/path.pdf",
-                file_size=100,
-                status=DocumentStatus.PENDING,
-                verification_status=VerificationStatus.UNVERIFIED
-            ).validate()
\ No newline at end of file
+        with pytest.raises(mongoengine.ValidationError):
+            make_doc(**{bad_field: bad_value}).validate()
+
+    def test_sniff_mime(self):
+        """Test MIME detection from leading magic bytes."""
+        assert sniff_mime(b'%PDF-1.7\n') == 'application/pdf'
+        assert sniff_mime(b'\x89PNG\r\n\x1a\n\x00') == 'image/png'
+        assert sniff_mime(b'\xff\xd8\xff\xe0') == 'image/jpeg'
+        assert sniff_mime(b'MZ\x90\x00') is None
+
+    def test_container_mime_type_confirmed(self):
+        """Test that a ZIP prefix alone is not accepted as a Word document."""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('payload.txt', 'not a document')
+
+        is_valid, error = validate_mime_type(
+            archive.getvalue(),
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        )
+        assert not is_valid
+        assert 'MIME type mismatch' in error
+
+    @pytest.mark.parametrize('accept_encoding,expected', [
+        ('*', 'zstd'),
+        ('gzip', 'gzip'),
+        ('br;q=0.5, gzip', 'br'),
+        ('zstd;q=0, *', 'br'),
+        ('zstd;q=0, br;q=0, *', 'gzip'),
+        ('*;q=0', None),
+        ('identity', None),
+        ('', None),
+    ])
+    def test_select_encoding(self, accept_encoding, expected):
+        """Test encoding negotiation, including explicit refusals under a wildcard."""
+        assert select_encoding(accept_encoding) == expected
+
+    def test_compression_middleware(self):
+        """Test that large bodies are compressed and small ones pass through."""
+        large_body = 'x' * 4096
+        compressed_app = Starlette(routes=[
+            Route('/large', lambda request: PlainTextResponse(large_body)),
+            Route('/small', lambda request: PlainTextResponse('ok')),
+        ])
+        compressed_app.add_middleware(CompressionMiddleware, minimum_size=512)
+
+        with TestClient(compressed_app) as client:
+            response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['content-encoding'] == 'gzip'
+            assert response.headers['vary'] == 'Accept-Encoding'
+            assert response.text == large_body
+
+            response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+            assert 'content-encoding' not in response.headers
+            assert response.text == 'ok'
+
+            response = client.get('/large', headers={'Accept-Encoding': 'gzip;q=0, *;q=0'})
+            assert 'content-encoding' not in response.headers